@@ -0,0 +1,171 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from .core.recognizer import RECOGNIZER_BACKENDS
+
+EXIT_OK = 0
+EXIT_PAGE_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_MODELS = 3
+EXIT_INTERRUPTED = 130
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="run.py ocr",
+        description="Пакетное распознавание страниц без GUI, результат построчно в JSON Lines.",
+    )
+    parser.add_argument("inputs", nargs="+", help="папки с изображениями и/или файлы")
+    parser.add_argument("-o", "--out", default="-", help="файл .jsonl (по умолчанию stdout)")
+    parser.add_argument("--models", default=None, help="папка с model_manga_ocr и yolo_m.pt")
+    parser.add_argument("--recognizer", choices=RECOGNIZER_BACKENDS, default=None,
+                        help="движок распознавания (по умолчанию MANGAOCR_RECOGNIZER или torch)")
+    parser.add_argument("--cache", default=None, help="файл SQLite-кэша OCR (по умолчанию без кэша)")
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--detect-workers", type=int, default=1)
+    parser.add_argument("--recognize-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--detect-batch-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=8, help="кропов на один проход распознавания")
+    parser.add_argument("--detect-short-side", type=int, default=None,
+                        help="короткая сторона страницы для детекции (0 - исходное разрешение, по умолчанию 1280)")
+    parser.add_argument("--trace", default=None, help="записать тайминги этапов в Chrome trace JSON (Perfetto)")
+    parser.add_argument("--tile-aspect", type=float, default=None,
+                        help="детекция окнами при соотношении сторон выше порога (по умолчанию 3)")
+    parser.add_argument("--tile-pixels", type=int, default=None,
+                        help="детекция окнами при числе пикселей выше порога")
+    parser.add_argument("--tile-size", type=int, default=None, help="сторона окна детекции")
+    return parser
+
+def collect_inputs(inputs):
+    from .core.utils import natural_key, IMAGE_EXTENSIONS
+
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(
+                f for f in sorted(p.iterdir(), key=lambda x: natural_key(x.name))
+                if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS
+            )
+        elif p.is_file():
+            paths.append(p)
+        else:
+            raise FileNotFoundError(item)
+    return paths
+
+def page_record(idx, path, boxes, frames, info):
+    from .core.utils import assign_frames, sort_reading_order
+
+    assign_frames(boxes, frames)
+    ordered = sort_reading_order(boxes)
+    timings = dict(info.get('timings', {}))
+    record = {
+        "index": idx,
+        "path": str(path),
+        "boxes": [
+            {
+                "rect": _rect(box.rect),
+                "text": box.text or "",
+                "frame": _rect(getattr(box, 'frame_rect', None)),
+            }
+            for box in ordered
+        ],
+        "frames": [_rect(getattr(f, 'rect', f)) for f in frames or []],
+        "text": [box.text for box in ordered if box.text],
+        "timings": {k: round(v, 6) for k, v in timings.items()},
+        "cached": bool(info.get('cached', False)),
+    }
+    if info.get('error'):
+        record["error"] = info['error']
+    return record
+
+def _rect(rect):
+    if rect is None:
+        return None
+    return [rect.x(), rect.y(), rect.width(), rect.height()]
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        paths = collect_inputs(args.inputs)
+    except FileNotFoundError as e:
+        print(f"Путь не найден: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not paths:
+        print("Не найдено изображений", file=sys.stderr)
+        return EXIT_USAGE
+
+    from .ignore import ignore_warnings
+    from .core.pipeline import OCRPipeline
+    from .core.detection import set_detect_resolution, set_tiling
+
+    ignore_warnings()
+    set_detect_resolution(args.detect_short_side)
+    if args.trace:
+        from .core.trace import tracer
+        tracer.enable(args.trace)
+    set_tiling(max_aspect=args.tile_aspect, max_pixels=args.tile_pixels, tile_size=args.tile_size)
+
+    t0 = time.perf_counter()
+    try:
+        from .core.threads import load_models
+        mocr, yolo = load_models(args.models, recognizer_backend=args.recognizer)
+    except Exception as e:
+        print(f"Ошибка загрузки моделей: {e}", file=sys.stderr)
+        return EXIT_MODELS
+    print(f"Модели загружены за {time.perf_counter() - t0:.1f} с", file=sys.stderr)
+
+    ocr_cache = None
+    if args.cache:
+        from .core.cache import OCRCache
+        ocr_cache = OCRCache(db_path=args.cache)
+        ocr_cache.set_models(detector=yolo, recognizer=mocr)
+
+    app_ref = SimpleNamespace(mocr=mocr, yolo_detector=yolo, ocr_cache=ocr_cache)
+    pipeline = OCRPipeline(
+        app_ref,
+        decode_workers=args.decode_workers,
+        detect_workers=args.detect_workers,
+        recognize_workers=args.recognize_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        detect_batch_size=args.detect_batch_size,
+    )
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    failed = [0]
+
+    def on_finished(idx, path, boxes, frames, info):
+        record = page_record(idx, path, boxes, frames, info)
+        if "error" in record:
+            failed[0] += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        print(f"[{idx + 1}/{len(paths)}] {path}", file=sys.stderr)
+
+    try:
+        pipeline.run(paths, on_finished=on_finished)
+    except KeyboardInterrupt:
+        pipeline.stop()
+        return EXIT_INTERRUPTED
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if ocr_cache is not None:
+            ocr_cache.close()
+        if args.trace:
+            tracer.save()
+
+    from .core.cache import crop_memo
+    stats = crop_memo.stats()
+    print(f"Повторяющиеся кропы: {stats['hits']} из {stats['hits'] + stats['misses']} "
+          f"({stats['hit_rate']:.0%})", file=sys.stderr)
+
+    if failed[0]:
+        print(f"Ошибок: {failed[0]} из {len(paths)}", file=sys.stderr)
+        return EXIT_PAGE_ERRORS
+    return EXIT_OK
@@ -1,63 +1,452 @@
-from PySide6.QtCore import QByteArray, QBuffer
-from PySide6.QtGui import QPixmap
-import hashlib
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QImage, QPixmap
+from collections import OrderedDict
 from pathlib import Path
+import hashlib
+import json
+import os
+import stat
+import sqlite3
+import threading
+import time
+from .utils import MangaTextBox
+
+CACHE_SCHEMA_VERSION = 3
+TOUCH_BATCH = 256
+UNKNOWN_FINGERPRINT = "unknown"
+DETECTIONS = "detections"
+RECOGNITIONS = "recognitions"
 
 class OCRCache:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, db_path=None, max_entries=5000, memory_entries=64, persistent=True, max_paths=20000):
+        self.cache = OrderedDict()
         self.path_map = {}
+        self.stat_index = OrderedDict()
+        self.max_entries = max_entries
+        self.max_paths = max_paths
+        self.memory_entries = memory_entries
+        self.db_path = Path(db_path) if db_path else Path.home() / ".mangaocr_ocr_cache.sqlite3"
+        self.persistent = persistent
+        self.detector_fingerprint = None
+        self.recognizer_fingerprint = None
+        self._db = None
+        self._lock = threading.RLock()
+        self._touches = {}
+        self._path_touches = {}
+
+    def set_models(self, detector=None, recognizer=None):
+        if detector is not None:
+            from .detection import detector_fingerprint
+            self.detector_fingerprint = detector_fingerprint(detector)
+        if recognizer is not None:
+            self.recognizer_fingerprint = getattr(recognizer, 'fingerprint', None) or type(recognizer).__name__
+
+    def _connect(self):
+        if self._db is not None or not self.persistent:
+            return self._db
+        try:
+            db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(db)
+            db.commit()
+            self._db = db
+        except Exception as e:
+            print("Ошибка открытия кэша OCR:", e)
+            self.persistent = False
+            self._db = None
+        return self._db
+
+    def _migrate(self, db):
+        for table in (DETECTIONS, RECOGNITIONS):
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "digest TEXT NOT NULL, fingerprint TEXT NOT NULL, data TEXT NOT NULL, "
+                "last_access REAL NOT NULL, PRIMARY KEY (digest, fingerprint))"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS path_index ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "inode INTEGER NOT NULL, digest TEXT NOT NULL, last_access REAL NOT NULL DEFAULT 0)"
+        )
+
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        if version >= CACHE_SCHEMA_VERSION:
+            return
+        columns = {row[1] for row in db.execute("PRAGMA table_info(path_index)")}
+        if "last_access" not in columns:
+            db.execute("ALTER TABLE path_index ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        db.execute("CREATE INDEX IF NOT EXISTS path_index_last_access ON path_index(last_access)")
+        legacy = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries'").fetchone()
+        if legacy is not None:
+            for md5, data, last_access in db.execute("SELECT md5, data, last_access FROM entries").fetchall():
+                try:
+                    boxes, frames = deserialize_entry(data)
+                except Exception:
+                    continue
+                for table, layer in ((DETECTIONS, detection_data(boxes, frames)),
+                                     (RECOGNITIONS, recognition_data(boxes))):
+                    db.execute(
+                        f"INSERT OR IGNORE INTO {table} (digest, fingerprint, data, last_access) VALUES (?, ?, ?, ?)",
+                        (md5, UNKNOWN_FINGERPRINT, json.dumps(layer, ensure_ascii=False), last_access)
+                    )
+            db.execute("DROP TABLE entries")
+        db.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._flush_touches(self._db)
+                    self._db.commit()
+                except Exception:
+                    pass
+                try:
+                    self._db.close()
+                except Exception:
+                    pass
+                self._db = None
 
     def clear(self):
-        self.cache.clear()
-        self.path_map.clear()
+        with self._lock:
+            self.cache.clear()
+            self.path_map.clear()
+            self.stat_index.clear()
+            self._touches.clear()
+            self._path_touches.clear()
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute(f"DELETE FROM {DETECTIONS}")
+                    db.execute(f"DELETE FROM {RECOGNITIONS}")
+                    db.execute("DELETE FROM path_index")
+                    db.commit()
+                except Exception:
+                    pass
+
+    def _remember(self, key, data):
+        self.cache[key] = data
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.memory_entries:
+            self.cache.popitem(last=False)
+
+    def _resolve(self, db, table, digest, fingerprint):
+        if fingerprint is not None:
+            return fingerprint
+        for key in reversed(self.cache):
+            if key[0] == table and key[1] == digest:
+                return key[2]
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                f"SELECT fingerprint FROM {table} WHERE digest = ? ORDER BY last_access DESC LIMIT 1", (digest,)
+            ).fetchone()
+        except Exception:
+            row = None
+        return row[0] if row else None
+
+    def _layer_get(self, db, table, digest, fingerprint):
+        fingerprint = self._resolve(db, table, digest, fingerprint)
+        if fingerprint is None:
+            return None
+        key = (table, digest, fingerprint)
+        data = self.cache.get(key)
+        if data is not None:
+            self.cache.move_to_end(key)
+            self._touch(db, table, digest, fingerprint)
+            return data
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                f"SELECT data FROM {table} WHERE digest = ? AND fingerprint = ?", (digest, fingerprint)
+            ).fetchone()
+        except Exception:
+            row = None
+        if row is None:
+            return None
+        try:
+            data = json.loads(row[0])
+        except Exception:
+            return None
+        self._remember(key, data)
+        self._touch(db, table, digest, fingerprint)
+        return data
+
+    def _layer_put(self, db, table, digest, fingerprint, data):
+        fingerprint = self._resolve(db, table, digest, fingerprint) or UNKNOWN_FINGERPRINT
+        self._remember((table, digest, fingerprint), data)
+        self._touches.pop((table, digest, fingerprint), None)
+        if db is None:
+            return
+        db.execute(
+            f"INSERT OR REPLACE INTO {table} (digest, fingerprint, data, last_access) VALUES (?, ?, ?, ?)",
+            (digest, fingerprint, json.dumps(data, ensure_ascii=False), time.time())
+        )
+        self._evict(db, table)
 
-    def set_by_md5(self, md5, boxes, frames):
+    def _evict(self, db, table):
+        if not self.max_entries or self.max_entries <= 0:
+            return
+        self._flush_touches(db)
+        count = db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            db.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def _touch(self, db, table, digest, fingerprint):
+        if db is not None:
+            self._touches[(table, digest, fingerprint)] = time.time()
+
+    def _flush_touches(self, db):
+        touches, self._touches = self._touches, {}
+        for table in (DETECTIONS, RECOGNITIONS):
+            rows = [(ts, digest, fingerprint) for (t, digest, fingerprint), ts in touches.items() if t == table]
+            if rows:
+                db.executemany(f"UPDATE {table} SET last_access = ? WHERE digest = ? AND fingerprint = ?", rows)
+        paths, self._path_touches = self._path_touches, {}
+        if paths:
+            db.executemany("UPDATE path_index SET last_access = ? WHERE path = ?", [(ts, p) for p, ts in paths.items()])
+
+    def _maybe_flush(self, db):
+        if db is None or len(self._touches) + len(self._path_touches) < TOUCH_BATCH:
+            return
+        try:
+            self._flush_touches(db)
+            db.commit()
+        except Exception:
+            pass
+
+    def set_by_md5(self, md5, boxes, frames, recognized=True):
+        if not md5:
+            return
+        detection = detection_data(boxes, frames)
+        recognition = recognition_data(boxes) if recognized else None
+        with self._lock:
+            db = self._connect()
+            if (self._layer_get(db, DETECTIONS, md5, self.detector_fingerprint) == detection
+                    and (recognition is None or self._layer_get(db, RECOGNITIONS, md5, self.recognizer_fingerprint) == recognition)):
+                self._maybe_flush(db)
+                return
+            try:
+                self._layer_put(db, DETECTIONS, md5, self.detector_fingerprint, detection)
+                if recognized:
+                    self._put_texts(db, md5, boxes)
+                if db is not None:
+                    db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                print("Ошибка записи кэша OCR:", e)
+
+    def set_texts(self, md5, boxes, merge=False):
         if not md5:
             return
-        self.cache[md5] = (boxes, frames, md5)
+        with self._lock:
+            db = self._connect()
+            try:
+                self._put_texts(db, md5, boxes, merge)
+                if db is not None:
+                    db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                print("Ошибка записи кэша OCR:", e)
+
+    def _put_texts(self, db, md5, boxes, merge=False):
+        texts = {}
+        if merge:
+            detection = self._layer_get(db, DETECTIONS, md5, self.detector_fingerprint) or {}
+            known = {tuple(item["rect"]) for item in detection.get("boxes", [])}
+            previous = self._layer_get(db, RECOGNITIONS, md5, self.recognizer_fingerprint) or {}
+            texts = {tuple(item[:4]): item[4] for item in previous.get("texts", []) if tuple(item[:4]) in known}
+        for item in recognition_data(boxes)["texts"]:
+            texts[tuple(item[:4])] = item[4]
+        data = {"texts": [list(rect) + [text] for rect, text in texts.items()]}
+        self._layer_put(db, RECOGNITIONS, md5, self.recognizer_fingerprint, data)
+
+    def lookup(self, md5):
+        if not md5:
+            return None
+        with self._lock:
+            db = self._connect()
+            detection = self._layer_get(db, DETECTIONS, md5, self.detector_fingerprint)
+            if detection is None:
+                return None
+            recognition = self._layer_get(db, RECOGNITIONS, md5, self.recognizer_fingerprint) or {}
+            self._maybe_flush(db)
+
+        boxes, frames = boxes_from_detection(detection)
+        return boxes, frames, apply_texts(recognition, boxes)
+
+    def fill_texts(self, md5, boxes):
+        if not md5:
+            return list(boxes)
+        with self._lock:
+            db = self._connect()
+            recognition = self._layer_get(db, RECOGNITIONS, md5, self.recognizer_fingerprint) or {}
+            self._maybe_flush(db)
+        return apply_texts(recognition, boxes)
+
+    def fill_texts_for_path(self, path, boxes):
+        try:
+            md5 = self.digest_for_path(path)
+        except Exception:
+            md5 = None
+        return self.fill_texts(md5, boxes)
 
     def get_by_md5(self, md5):
-        return self.cache.get(md5)
+        found = self.lookup(md5)
+        if found is None or found[2]:
+            return None
+        return found[0], found[1], md5
 
     def has_md5(self, md5):
-        return md5 in self.cache
+        return self.get_by_md5(md5) is not None
+
+    def digest_for_path(self, path):
+        try:
+            key = stat_key(path)
+        except OSError:
+            self._forget_path(os.path.abspath(str(path)))
+            raise
+        path_str = key[0]
+        with self._lock:
+            known = self.stat_index.get(path_str)
+            if known is not None and known[0] == key:
+                self.stat_index.move_to_end(path_str)
+                return known[1]
+
+            db = self._connect()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT size, mtime_ns, inode, digest FROM path_index WHERE path = ?", (path_str,)
+                    ).fetchone()
+                except Exception:
+                    row = None
+                if row is not None and (path_str,) + tuple(row[:3]) == key:
+                    self._remember_path(path_str, key, row[3])
+                    self._path_touches[path_str] = time.time()
+                    self._maybe_flush(db)
+                    return row[3]
+                if row is not None:
+                    self._forget_path(path_str)
 
-    def set_for_path(self, path, boxes, frames):
+        digest = file_digest(path)
+
+        with self._lock:
+            self._remember_path(path_str, key, digest)
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO path_index (path, size, mtime_ns, inode, digest, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        key + (digest, time.time())
+                    )
+                    self._evict_paths(db)
+                    db.commit()
+                except Exception:
+                    pass
+        return digest
+
+    def _remember_path(self, path_str, key, digest):
+        self.stat_index[path_str] = (key, digest)
+        self.stat_index.move_to_end(path_str)
+        while self.max_paths and len(self.stat_index) > self.max_paths:
+            self.stat_index.popitem(last=False)
+
+    def _forget_path(self, path_str):
+        with self._lock:
+            self.stat_index.pop(path_str, None)
+            self._path_touches.pop(path_str, None)
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute("DELETE FROM path_index WHERE path = ?", (path_str,))
+                db.commit()
+            except Exception:
+                pass
+
+    def _evict_paths(self, db):
+        if not self.max_paths or self.max_paths <= 0:
+            return
+        self._flush_touches(db)
+        count = db.execute("SELECT COUNT(*) FROM path_index").fetchone()[0]
+        excess = count - self.max_paths
+        if excess > 0:
+            db.execute(
+                "DELETE FROM path_index WHERE path IN "
+                "(SELECT path FROM path_index ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def set_for_path(self, path, boxes, frames, recognized=True):
         try:
-            md5 = md5_from_path(path)
+            md5 = self.digest_for_path(path)
         except Exception:
             md5 = None
         if md5:
-            self.set_by_md5(md5, boxes, frames)
+            self.set_by_md5(md5, boxes, frames, recognized)
             self.path_map[str(path)] = md5
 
     def get_for_path(self, path):
+        found = self.lookup_for_path(path)
+        if found is None or found[2]:
+            return None
+        return found[0], found[1], found[3]
+
+    def lookup_for_path(self, path):
         try:
-            md5 = md5_from_path(path)
+            md5 = self.digest_for_path(path)
         except Exception:
             md5 = None
-        if not md5:
+        found = self.lookup(md5)
+        if found is None:
             return None
-        return self.get_by_md5(md5)
+        return found + (md5,)
+
+    def update_box_for_path(self, path, box):
+        try:
+            md5 = self.digest_for_path(path)
+        except Exception:
+            return False
+        self.set_texts(md5, [box], merge=True)
+        return True
 
-    def set_for_pixmap(self, pixmap, boxes, frames):
+    def set_for_pixmap(self, pixmap, boxes, frames, recognized=True):
         md5 = pixmap_md5(pixmap)
         if md5:
-            self.set_by_md5(md5, boxes, frames)
+            self.set_by_md5(md5, boxes, frames, recognized)
 
     def get_for_pixmap(self, pixmap):
+        return self.get_by_md5(pixmap_md5(pixmap))
+
+    def lookup_for_pixmap(self, pixmap):
         md5 = pixmap_md5(pixmap)
-        if not md5:
+        found = self.lookup(md5)
+        if found is None:
             return None
-        return self.get_by_md5(md5)
+        return found + (md5,)
 
     def __contains__(self, key):
         if not key:
             return False
         if isinstance(key, str) and len(key) == 32 and all(c in "0123456789abcdef" for c in key.lower()):
-            return key in self.cache
-        return str(key) in self.path_map and self.path_map[str(key)] in self.cache
+            return self.has_md5(key)
+        try:
+            md5 = self.digest_for_path(key)
+        except Exception:
+            return False
+        return self.has_md5(md5)
 
     def __getitem__(self, key):
         if isinstance(key, str) and len(key) == 32 and all(c in "0123456789abcdef" for c in key.lower()):
@@ -67,7 +456,7 @@ class OCRCache:
         if md5:
             return self.get_by_md5(md5)
         try:
-            md5 = md5_from_path(path)
+            md5 = self.digest_for_path(path)
         except Exception:
             md5 = None
         if md5:
@@ -84,7 +473,7 @@ class OCRCache:
             return
         path = str(key)
         try:
-            md5 = md5_from_path(path)
+            md5 = self.digest_for_path(path)
         except Exception:
             md5 = None
         if md5:
@@ -93,35 +482,173 @@ class OCRCache:
         else:
             raise ValueError("Could not compute md5 for key")
 
+class CropMemo:
+    def __init__(self, max_entries=20000):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            text = self.entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        if key is None or text is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def add_hits(self, count=1):
+        with self._lock:
+            self.hits += count
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+crop_memo = CropMemo()
+
+def crop_digest(crop, fingerprint, channels="bgr"):
+    if crop is None or not fingerprint:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{fingerprint}|{channels}|{crop.shape}|{crop.dtype}".encode())
+    if crop.flags.c_contiguous:
+        h.update(crop)
+    else:
+        for row in crop:
+            h.update(row if row.flags.c_contiguous else row.tobytes())
+    return h.hexdigest()
+
 def pixmap_md5(pixmap):
     if pixmap is None:
         return None
-    if not isinstance(pixmap, QPixmap):
-        try:
-            pixmap = QPixmap(pixmap)
-        except Exception:
-            return None
-    ba = QByteArray()
-    buffer = QBuffer(ba)
-    if not buffer.open(QBuffer.WriteOnly):
+    if isinstance(pixmap, QImage):
+        image = pixmap
+    else:
+        if not isinstance(pixmap, QPixmap):
+            try:
+                pixmap = QPixmap(pixmap)
+            except Exception:
+                return None
+        image = pixmap.toImage()
+    if image.isNull():
         return None
-    try:
-        ok = pixmap.save(buffer, "PNG")
-        if not ok:
-            return None
-        data = ba.data()
-        if isinstance(data, memoryview):
-            data = data.tobytes()
-        return hashlib.md5(data).hexdigest()
-    finally:
-        buffer.close()
-
-def md5_from_path(path):
+
+    width, height = image.width(), image.height()
+    bytes_per_line = image.bytesPerLine()
+    row_bytes = (width * image.depth() + 7) // 8
+    fmt = image.format()
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{width}x{height}:{getattr(fmt, 'value', fmt)}".encode())
+    data = memoryview(image.constBits())
+    if row_bytes == bytes_per_line:
+        h.update(data[:bytes_per_line * height])
+    else:
+        for y in range(height):
+            start = y * bytes_per_line
+            h.update(data[start:start + row_bytes])
+    return h.hexdigest()
+
+def detection_data(boxes, frames):
+    return {
+        "boxes": [
+            {"rect": _rect_to_list(box.rect), "frame_rect": _rect_to_list(getattr(box, 'frame_rect', None))}
+            for box in boxes or []
+        ],
+        "frames": [_rect_to_list(getattr(f, 'rect', f)) for f in frames or []],
+    }
+
+def recognition_data(boxes):
+    return {
+        "texts": [
+            _rect_to_list(box.rect) + [getattr(box, 'text', "") or ""]
+            for box in boxes or [] if not getattr(box, 'pending', False)
+        ]
+    }
+
+def apply_texts(recognition, boxes):
+    texts = {tuple(item[:4]): item[4] for item in recognition.get("texts", [])}
+    missing = []
+    for box in boxes:
+        text = texts.get(tuple(_rect_to_list(box.rect)))
+        if text is None:
+            missing.append(box)
+        else:
+            box.text = text
+    return missing
+
+def boxes_from_detection(data):
+    boxes = []
+    for item in data.get("boxes", []):
+        box = MangaTextBox(_rect_from_list(item["rect"]), "")
+        box.frame_rect = _rect_from_list(item.get("frame_rect"))
+        boxes.append(box)
+    frames = [MangaTextBox(_rect_from_list(r), "") for r in data.get("frames", [])]
+    return boxes, frames
+
+def deserialize_entry(data):
+    data = json.loads(data)
+    boxes = []
+    for item in data.get("boxes", []):
+        box = MangaTextBox(_rect_from_list(item["rect"]), item.get("text", ""))
+        box.frame_rect = _rect_from_list(item.get("frame_rect"))
+        boxes.append(box)
+    frames = [MangaTextBox(_rect_from_list(r), "") for r in data.get("frames", [])]
+    return boxes, frames
+
+def _rect_to_list(rect):
+    if rect is None:
+        return None
+    return [rect.x(), rect.y(), rect.width(), rect.height()]
+
+def _rect_from_list(values):
+    if values is None:
+        return None
+    return QRect(*values)
+
+def stat_key(path):
+    path_str = os.path.abspath(str(path))
+    st = os.stat(path_str)
+    if not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(path)
+    return (path_str, st.st_size, st.st_mtime_ns, st.st_ino)
+
+def file_digest(path):
     p = Path(path)
     if not p.exists() or not p.is_file():
         raise FileNotFoundError(path)
-    h = hashlib.md5()
+    h = hashlib.blake2b(digest_size=16)
     with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
+        for chunk in iter(lambda: f.read(1 << 20), b""):
             h.update(chunk)
-    return h.hexdigest()
\ No newline at end of file
+    return h.hexdigest()
@@ -0,0 +1,252 @@
+import hashlib
+import os
+import threading
+from PySide6.QtCore import QRect
+
+_detector_lock = threading.Lock()
+
+DETECT_CONF = 0.25
+DETECT_IOU = 0.45
+DETECT_CLASSES = [2, 3]
+
+DETECT_BATCH_SIZE = 4
+DETECT_MAX_BATCH_PIXELS = 4 * 3000 * 2000
+
+DETECT_MAX_SHORT_SIDE = 1280
+
+TILE_MAX_ASPECT = 3.0
+TILE_MAX_PIXELS = 40_000_000
+TILE_SIZE = 1536
+TILE_OVERLAP = 0.25
+TILE_MERGE_IOS = 0.6
+
+def set_tiling(max_aspect=None, max_pixels=None, tile_size=None, overlap=None):
+    global TILE_MAX_ASPECT, TILE_MAX_PIXELS, TILE_SIZE, TILE_OVERLAP
+    if max_aspect is not None:
+        TILE_MAX_ASPECT = float(max_aspect)
+    if max_pixels is not None:
+        TILE_MAX_PIXELS = int(max_pixels)
+    if tile_size is not None:
+        TILE_SIZE = int(tile_size)
+    if overlap is not None:
+        TILE_OVERLAP = float(overlap)
+
+def set_detect_resolution(max_short_side):
+    global DETECT_MAX_SHORT_SIDE
+    if max_short_side is not None:
+        DETECT_MAX_SHORT_SIDE = int(max_short_side)
+
+def detector_fingerprint(yolo_detector):
+    if yolo_detector is None:
+        return None
+    weights = getattr(yolo_detector, 'fingerprint', None)
+    if weights is None:
+        path = getattr(yolo_detector, 'ckpt_path', None) or getattr(yolo_detector, 'model_name', None)
+        weights = type(yolo_detector).__name__
+        if path:
+            weights = os.path.basename(str(path))
+            try:
+                st = os.stat(path)
+                weights = f"{weights}:{st.st_size}:{st.st_mtime_ns}"
+            except OSError:
+                pass
+    params = (
+        f"conf={DETECT_CONF}|iou={DETECT_IOU}|classes={DETECT_CLASSES}|short={DETECT_MAX_SHORT_SIDE}|"
+        f"tile={TILE_MAX_ASPECT},{TILE_MAX_PIXELS},{TILE_SIZE},{TILE_OVERLAP},{TILE_MERGE_IOS}"
+    )
+    return f"{weights}|{hashlib.blake2b(params.encode(), digest_size=8).hexdigest()}"
+
+def detect_text_boxes(yolo_detector, image_cv):
+    if yolo_detector is None:
+        return [], []
+
+    small = detection_input(image_cv)
+    if needs_tiling(small.shape):
+        detections = _detect_tiled(yolo_detector, small)
+    else:
+        with _detector_lock:
+            results = yolo_detector(small, conf=DETECT_CONF, iou=DETECT_IOU, classes=DETECT_CLASSES)
+        detections = _detections(results[0])
+
+    return build_boxes(rescale_detections(detections, small.shape, image_cv.shape))
+
+def detect_text_boxes_batch(yolo_detector, images, batch_size=DETECT_BATCH_SIZE,
+                            max_batch_pixels=DETECT_MAX_BATCH_PIXELS):
+    if yolo_detector is None:
+        return [([], []) for _ in images]
+
+    smalls = [detection_input(img) for img in images]
+    detections = [None] * len(images)
+    plain = []
+    for i, small in enumerate(smalls):
+        if needs_tiling(small.shape):
+            detections[i] = _detect_tiled(yolo_detector, small, batch_size, max_batch_pixels)
+        else:
+            plain.append(i)
+
+    pos = 0
+    for chunk in split_batches([smalls[i] for i in plain], batch_size, max_batch_pixels):
+        with _detector_lock:
+            results = yolo_detector(list(chunk), conf=DETECT_CONF, iou=DETECT_IOU, classes=DETECT_CLASSES)
+        for r in results:
+            detections[plain[pos]] = _detections(r)
+            pos += 1
+
+    return [
+        build_boxes(rescale_detections(d, small.shape, img.shape))
+        for d, small, img in zip(detections, smalls, images)
+    ]
+
+def detection_input(image_cv):
+    h, w = image_cv.shape[:2]
+    if h * w > TILE_MAX_PIXELS:
+        return image_cv
+    return downscale_for_detection(image_cv)
+
+def downscale_for_detection(image_cv, max_short_side=None):
+    max_short_side = DETECT_MAX_SHORT_SIDE if max_short_side is None else max_short_side
+    h, w = image_cv.shape[:2]
+    if not max_short_side or min(h, w) <= max_short_side:
+        return image_cv
+
+    import cv2
+
+    scale = max_short_side / min(h, w)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(image_cv, size, interpolation=cv2.INTER_AREA)
+
+def rescale_detections(detections, detect_shape, image_shape):
+    dh, dw = detect_shape[:2]
+    h, w = image_shape[:2]
+    if (dh, dw) == (h, w):
+        return detections
+
+    sx, sy = w / dw, h / dh
+    return [
+        (cls,
+         max(0, int(x1 * sx)), max(0, int(y1 * sy)),
+         min(w, int(round(x2 * sx))), min(h, int(round(y2 * sy))),
+         conf, tile)
+        for cls, x1, y1, x2, y2, conf, tile in detections
+    ]
+
+def split_batches(images, batch_size=DETECT_BATCH_SIZE, max_batch_pixels=DETECT_MAX_BATCH_PIXELS):
+    batch_size = max(1, int(batch_size))
+    chunk = []
+    chunk_pixels = 0
+    for img in images:
+        pixels = img.shape[0] * img.shape[1]
+        if chunk and (len(chunk) >= batch_size or chunk_pixels + pixels > max_batch_pixels):
+            yield chunk
+            chunk = []
+            chunk_pixels = 0
+        chunk.append(img)
+        chunk_pixels += pixels
+    if chunk:
+        yield chunk
+
+def needs_tiling(shape):
+    h, w = shape[:2]
+    if not h or not w:
+        return False
+    return max(h, w) / min(h, w) > TILE_MAX_ASPECT or h * w > TILE_MAX_PIXELS
+
+def tile_windows(shape, tile_size=None, overlap=None):
+    h, w = shape[:2]
+    tile_size = tile_size or TILE_SIZE
+    overlap = TILE_OVERLAP if overlap is None else overlap
+
+    side = tile_size
+    if max(h, w) / max(1, min(h, w)) > TILE_MAX_ASPECT:
+        side = max(tile_size, min(h, w))
+    tile_h, tile_w = min(h, side), min(w, side)
+
+    return [
+        (x, y, tile_w, tile_h)
+        for y in _tile_starts(h, tile_h, int(tile_h * overlap))
+        for x in _tile_starts(w, tile_w, int(tile_w * overlap))
+    ]
+
+def _tile_starts(length, tile, overlap):
+    if length <= tile:
+        return [0]
+    step = max(1, tile - overlap)
+    count = -(-(length - tile) // step) + 1
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+def detect_text_boxes_tiled(yolo_detector, image_cv, batch_size=DETECT_BATCH_SIZE,
+                            max_batch_pixels=DETECT_MAX_BATCH_PIXELS):
+    if yolo_detector is None:
+        return [], []
+    return build_boxes(_detect_tiled(yolo_detector, image_cv, batch_size, max_batch_pixels))
+
+def _detect_tiled(yolo_detector, image_cv, batch_size=DETECT_BATCH_SIZE,
+                  max_batch_pixels=DETECT_MAX_BATCH_PIXELS):
+    windows = tile_windows(image_cv.shape)
+    tiles = [image_cv[y:y + th, x:x + tw] for x, y, tw, th in windows]
+
+    detections = []
+    pos = 0
+    for chunk in split_batches(tiles, batch_size, max_batch_pixels):
+        with _detector_lock:
+            results = yolo_detector(list(chunk), conf=DETECT_CONF, iou=DETECT_IOU, classes=DETECT_CLASSES)
+        for r in results:
+            x, y = windows[pos][:2]
+            detections.extend(_detections(r, dx=x, dy=y, tile=pos))
+            pos += 1
+
+    return merge_tile_detections(detections)
+
+def merge_tile_detections(detections, iou=DETECT_IOU, ios=TILE_MERGE_IOS):
+    merged = []
+    for cls, x1, y1, x2, y2, conf, tile in sorted(detections, key=lambda d: d[5], reverse=True):
+        for m in merged:
+            if m[0] != cls or tile in m[6]:
+                continue
+            ix = min(x2, m[3]) - max(x1, m[1])
+            iy = min(y2, m[4]) - max(y1, m[2])
+            if ix <= 0 or iy <= 0:
+                continue
+            inter = ix * iy
+            area = (x2 - x1) * (y2 - y1)
+            m_area = (m[3] - m[1]) * (m[4] - m[2])
+            if inter / (area + m_area - inter) >= iou or inter / max(1, min(area, m_area)) >= ios:
+                m[1], m[2] = min(m[1], x1), min(m[2], y1)
+                m[3], m[4] = max(m[3], x2), max(m[4], y2)
+                m[6].add(tile)
+                break
+        else:
+            merged.append([cls, x1, y1, x2, y2, conf, {tile}])
+
+    return [(cls, x1, y1, x2, y2, conf, tiles) for cls, x1, y1, x2, y2, conf, tiles in merged]
+
+def parse_detections(result):
+    return build_boxes(_detections(result))
+
+def _detections(result, dx=0, dy=0, tile=0):
+    detections = []
+    for r in result.boxes:
+        cls = int(r.cls[0])
+        x1, y1, x2, y2 = map(int, r.xyxy[0].cpu().numpy())
+        conf = float(r.conf[0]) if getattr(r, 'conf', None) is not None else 0.0
+        detections.append((cls, x1 + dx, y1 + dy, x2 + dx, y2 + dy, conf, tile))
+    return detections
+
+def build_boxes(detections):
+    boxes = []
+    frames = []
+
+    for cls, x1, y1, x2, y2, *_ in detections:
+        rect = QRect(x1, y1, x2 - x1, y2 - y1)
+
+        obj = type('BoxOrFrame', (), {})()
+        obj.rect = rect
+        obj.text = ""
+
+        if cls == 3:
+            obj.frame_rect = None
+            boxes.append(obj)
+        elif cls == 2:
+            frames.append(obj)
+
+    return boxes, frames
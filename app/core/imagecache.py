@@ -0,0 +1,107 @@
+from PySide6.QtGui import QImage
+from collections import OrderedDict
+import threading
+from .cache import stat_key
+from .imaging import imread_unicode
+
+class DecodedImageCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, store=True):
+        key = stat_key(path)
+        path_str = key[0]
+
+        while True:
+            with self._lock:
+                entry = self.entries.get(path_str)
+                if entry is not None and entry[0] == key:
+                    self.entries.move_to_end(path_str)
+                    self.hits += 1
+                    return entry[1]
+                loading = self._loading.get(path_str)
+                if loading is None:
+                    self.misses += 1
+                    loading = self._loading[path_str] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            img = imread_unicode(path_str)
+            if img is not None:
+                img.flags.writeable = False
+                if store:
+                    self._store(path_str, key, img)
+            return img
+        finally:
+            with self._lock:
+                self._loading.pop(path_str, None)
+            loading.set()
+
+    def peek(self, path):
+        try:
+            key = stat_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.entries.get(key[0])
+            if entry is not None and entry[0] == key:
+                self.entries.move_to_end(key[0])
+                return entry[1]
+        return None
+
+    def qimage(self, path, store=True):
+        img = self.get(path, store=store)
+        if img is None:
+            return None
+        return bgr_to_qimage(img)
+
+    def _store(self, path_str, key, img):
+        with self._lock:
+            old = self.entries.pop(path_str, None)
+            if old is not None:
+                self.bytes -= old[1].nbytes
+            if img.nbytes > self.max_bytes:
+                return
+            self.entries[path_str] = (key, img)
+            self.bytes += img.nbytes
+            while self.bytes > self.max_bytes and self.entries:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def discard(self, path):
+        path_str = stat_key(path)[0]
+        with self._lock:
+            old = self.entries.pop(path_str, None)
+            if old is not None:
+                self.bytes -= old[1].nbytes
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+decoded_images = DecodedImageCache()
+
+def bgr_to_qimage(img):
+    height, width = img.shape[:2]
+    qimg = QImage(img.data, width, height, img.strides[0], QImage.Format.Format_BGR888)
+    qimg._array = img
+    return qimg
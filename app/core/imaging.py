@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+from PySide6.QtGui import QImage
+
+class QImageArray(np.ndarray):
+    def __array_finalize__(self, obj):
+        self._qimage = getattr(obj, '_qimage', None)
+
+def imread_unicode(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    img_array = np.frombuffer(data, np.uint8)
+    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+    return img
+
+def qimage_to_rgb(qimg):
+    if qimg.format() != QImage.Format.Format_RGB888:
+        qimg = qimg.convertToFormat(QImage.Format.Format_RGB888)
+    width, height = qimg.width(), qimg.height()
+    arr = np.ndarray(
+        (height, width, 3), np.uint8,
+        buffer=qimg.constBits(),
+        strides=(qimg.bytesPerLine(), 3, 1),
+    ).view(QImageArray)
+    arr._qimage = qimg
+    return arr
+
+def pixmap_to_rgb(pixmap):
+    return qimage_to_rgb(pixmap.toImage())
+
+def pixmap_to_cv(pixmap):
+    return cv2.cvtColor(pixmap_to_rgb(pixmap), cv2.COLOR_RGB2BGR)
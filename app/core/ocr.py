@@ -1,22 +1,40 @@
-from PySide6.QtCore import QThread, Signal, QRect
-from .utils import MangaTextBox, pixmap_to_cv
-from .cache import pixmap_md5
+from PySide6.QtCore import QThread, Signal
+from .utils import MangaTextBox
+from .imaging import pixmap_to_rgb
+from .imagecache import decoded_images
+from .cache import pixmap_md5, crop_digest, crop_memo
+from .recognizer import recognize_batch
+from .trace import tracer
+from .detection import detect_text_boxes, detect_text_boxes_batch, DETECT_BATCH_SIZE
 from pathlib import Path
 import os
+import threading
+import time
 import cv2
-import numpy as np
 from PIL import Image
 
 class OCRThread(QThread):
     finished = Signal(list, list, object, object)
     progress = Signal(int, int, object)
+    cancelled = Signal(object)
+    timings = Signal(object, object)
+
+    batch_size = 8
+    detect_batch_size = DETECT_BATCH_SIZE
 
     def __init__(self, app_ref, image_item, token=None):
         super().__init__()
         self.app_ref = app_ref
         self.image_item = image_item
         self.token = token
-        
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
     def run(self):
         items = self.image_item
 
@@ -24,132 +42,279 @@ class OCRThread(QThread):
             items = [items]
 
         for image_item in items:
-            self._process_ocr(image_item)
+            if self._cancel.is_set():
+                break
+            timings = {}
+            with tracer.span("page", timings, item=getattr(image_item, 'name', image_item)):
+                self._process_ocr(image_item, timings)
+            if tracer.enabled:
+                self.timings.emit(timings, self.token)
+
+        if self._cancel.is_set():
+            self.cancelled.emit(self.token)
 
-    def _process_ocr(self, image_item):
+    def _process_ocr(self, image_item, timings=None):
         provided_boxes = getattr(image_item, 'boxes', None) or getattr(image_item, 'provided_boxes', None)
 
+        cached = None
         if provided_boxes is None and hasattr(self.app_ref, 'ocr_cache'):
-            try:
-                if isinstance(image_item, Path):
-                    cached = self.app_ref.ocr_cache.get_for_path(image_item)
-                    if cached:
-                        boxes, frames, md5 = cached
-                        self.finished.emit(boxes, frames, None, self.token)
-                        return
-                else:
-                    pix = getattr(image_item, 'pixmap', None)
-                    if pix is not None:
-                        cached = self.app_ref.ocr_cache.get_for_pixmap(pix)
-                        if cached:
-                            boxes, frames, md5 = cached
-                            self.finished.emit(boxes, frames, None, self.token)
-                            return
-            except Exception:
-                pass
+            with tracer.span("cache_lookup", timings):
+                cached = self._cached(image_item)
+            if cached and not cached[2]:
+                boxes, frames = cached[0], cached[1]
+                self.finished.emit(boxes, frames, None, self.token)
+                return
 
         img_cv = None
-        if isinstance(image_item, Path):
-            img_cv = self.imread_unicode(image_item)
-        elif hasattr(image_item, 'pixmap') and image_item.pixmap:
-            img_cv = pixmap_to_cv(image_item.pixmap)
+        img_rgb = None
+        with tracer.span("decode", timings):
+            if isinstance(image_item, Path):
+                img_cv = self.imread_unicode(image_item)
+            elif hasattr(image_item, 'pixmap') and image_item.pixmap:
+                img_rgb = pixmap_to_rgb(image_item.pixmap)
+                if provided_boxes is None and cached is None:
+                    img_cv = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
 
-        if img_cv is None:
+        if self._cancel.is_set():
+            return
+
+        if img_cv is None and img_rgb is None:
             self.finished.emit([], [], None, self.token)
             return
 
         if provided_boxes is not None:
-            boxes = provided_boxes
+            boxes = pending = provided_boxes
             frames = getattr(image_item, 'frames', []) or []
+        elif cached:
+            boxes, frames, pending = cached[0], cached[1], cached[2]
         else:
-            boxes, frames = self.detect_text_boxes(img_cv)
-        total = len(boxes)
-        h_img, w_img = img_cv.shape[:2]
+            with tracer.span("detect", timings):
+                boxes, frames = self.detect_text_boxes(img_cv)
+            pending = self._cached_texts(image_item, boxes)
 
-        for idx, box in enumerate(boxes):
-            x, y, w, h = box.rect.getRect()[0:4] 
-            x, y = max(0, x), max(0, y)
-            w, h = min(w, w_img - x), min(h, h_img - y)
-            if w <= 0 or h <= 0:
-                continue
+        if self._cancel.is_set():
+            return
 
-            crop_img = img_cv[y:y+h, x:x+w]
-            if crop_img is None or crop_img.size == 0:
-                continue
+        def on_progress(done, total):
+            self.progress.emit(done, total, self.token)
 
-            try:
-                pil_img = Image.fromarray(cv2.cvtColor(crop_img, cv2.COLOR_BGR2RGB))
-            except Exception:
-                continue
+        with tracer.span("wait_recognizer", timings):
+            mocr = wait_for_recognizer(self.app_ref, self._cancel.is_set)
+        if self._cancel.is_set():
+            return
 
-            mocr_callable = getattr(self.app_ref, 'mocr', None)
-            if callable(mocr_callable):
-                try:
-                    text = mocr_callable(pil_img)
-                except Exception:
-                    text = ""
+        with tracer.span("recognize", timings, crops=len(pending)):
+            if img_rgb is not None:
+                recognize_boxes(mocr, img_rgb, pending,
+                                batch_size=self.batch_size, on_progress=on_progress, rgb=True,
+                                should_stop=self._cancel.is_set)
             else:
-                text = ""
-            box.text = text
+                recognize_boxes(mocr, img_cv, pending,
+                                batch_size=self.batch_size, on_progress=on_progress,
+                                should_stop=self._cancel.is_set)
 
-            self.progress.emit(idx + 1, total, self.token)
+        if self._cancel.is_set():
+            return
 
         if hasattr(self.app_ref, 'ocr_cache'):
             try:
-                if isinstance(self.image_item, Path):
-                    self.app_ref.ocr_cache.set_for_path(self.image_item, boxes, frames)
-                else:
-                    pix = getattr(image_item, 'pixmap', None)
-                    if pix is not None:
-                        self.app_ref.ocr_cache.set_for_pixmap(pix, boxes, frames)
+                with tracer.span("cache_store", timings):
+                    recognized = mocr is not None
+                    if isinstance(image_item, Path):
+                        self.app_ref.ocr_cache.set_for_path(image_item, boxes, frames, recognized)
+                    else:
+                        pix = getattr(image_item, 'pixmap', None)
+                        if pix is not None:
+                            self.app_ref.ocr_cache.set_for_pixmap(pix, boxes, frames, recognized)
             except Exception:
                 pass
 
         self.finished.emit(boxes, frames, img_cv, self.token)
 
+    def _cached(self, image_item):
+        try:
+            if isinstance(image_item, Path):
+                return self.app_ref.ocr_cache.lookup_for_path(image_item)
+            pix = getattr(image_item, 'pixmap', None)
+            if pix is not None:
+                return self.app_ref.ocr_cache.lookup_for_pixmap(pix)
+        except Exception:
+            pass
+        return None
+
+    def _cached_texts(self, image_item, boxes):
+        cache = getattr(self.app_ref, 'ocr_cache', None)
+        if cache is None or not isinstance(image_item, Path):
+            return boxes
+        try:
+            return cache.fill_texts_for_path(image_item, boxes)
+        except Exception:
+            return boxes
+
     def imread_unicode(self, path):
-        with open(path, 'rb') as f:
-            data = f.read()
-        img_array = np.frombuffer(data, np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        return img
+        return decoded_images.get(path)
 
     def detect_text_boxes(self, image_cv):
-        boxes = []
-        frames = []
-
         yolo_detector = getattr(self.app_ref, 'yolo_detector', None)
-        if yolo_detector is not None:
-            results = yolo_detector(image_cv, conf=0.25, iou=0.45, classes = [2,3])
+        if isinstance(image_cv, (list, tuple)):
+            return detect_text_boxes_batch(yolo_detector, image_cv, batch_size=self.detect_batch_size)
+        return detect_text_boxes(yolo_detector, image_cv)
+
+def wait_for_recognizer(app_ref, should_stop=None, poll=0.05):
+    while should_stop is None or not should_stop():
+        mocr = getattr(app_ref, 'mocr', None)
+        loader = getattr(app_ref, 'models_thread', None)
+        if mocr is None and loader is not None:
+            mocr = getattr(loader, 'recognizer', None)
+        if mocr is not None:
+            return mocr
+        if loader is None or not loader.isRunning():
+            return getattr(app_ref, 'mocr', None) or getattr(loader, 'recognizer', None)
+        time.sleep(poll)
+    return None
+
+def recognize_boxes(mocr, img_cv, boxes, batch_size=8, on_progress=None, rgb=False, should_stop=None,
+                    memo=None):
+    total = len(boxes)
+    h_img, w_img = img_cv.shape[:2]
+
+    if memo is None:
+        memo = crop_memo
+    fingerprint = getattr(mocr, 'fingerprint', None) if memo is not False else None
+    channels = "rgb" if rgb else "bgr"
 
-            for r in results[0].boxes:
-                cls = int(r.cls[0])
-                x1, y1, x2, y2 = map(int, r.xyxy[0].cpu().numpy())
-                rect = QRect(x1, y1, x2 - x1, y2 - y1)
+    pending = []
+    duplicates = {}
+    done = 0
 
-                obj = type('BoxOrFrame', (), {})()
-                obj.rect = rect
-                obj.text = "" 
+    def advance(count=1):
+        nonlocal done
+        done += count
+        if on_progress is not None:
+            on_progress(done, total)
 
-                if cls == 3:
-                    obj.frame_rect = None  
-                    boxes.append(obj)
-                elif cls == 2:
-                    frames.append(obj)
+    with tracer.span("crop_prepare", crops=total):
+        for idx, box in enumerate(boxes):
+            x, y, w, h = box.rect.getRect()[0:4]
+            x, y = max(0, x), max(0, y)
+            w, h = min(w, w_img - x), min(h, h_img - y)
+            if w <= 0 or h <= 0:
+                advance()
+                continue
+
+            crop_img = img_cv[y:y+h, x:x+w]
+            if crop_img is None or crop_img.size == 0:
+                advance()
+                continue
+
+            key = crop_digest(crop_img, fingerprint, channels) if fingerprint else None
+            if key is not None:
+                if key in duplicates:
+                    duplicates[key].append(box)
+                    memo.add_hits()
+                    continue
+                text = memo.get(key)
+                if text is not None:
+                    box.text = text
+                    advance()
+                    continue
+
+            try:
+                if rgb:
+                    pil_img = Image.fromarray(crop_img)
+                else:
+                    pil_img = Image.fromarray(cv2.cvtColor(crop_img, cv2.COLOR_BGR2RGB))
+            except Exception:
+                advance()
+                continue
+
+            pending.append((idx, box, pil_img, key))
+            if key is not None:
+                duplicates[key] = []
+
+    for start in range(0, len(pending), max(1, batch_size)):
+        if should_stop is not None and should_stop():
+            break
+        chunk = pending[start:start + max(1, batch_size)]
+        texts = None
+        if callable(mocr):
+            try:
+                with tracer.span("recognize_batch", crops=len(chunk)):
+                    texts = recognize_batch(mocr, [pil_img for _, _, pil_img, _ in chunk])
+            except Exception:
+                texts = None
 
-        return boxes, frames
+        for pos, (idx, box, pil_img, key) in enumerate(chunk):
+            if texts is None and should_stop is not None and should_stop():
+                break
+            if texts is not None:
+                text = texts[pos]
+            elif callable(mocr):
+                try:
+                    text = mocr(pil_img)
+                except Exception:
+                    text = None
+            else:
+                text = None
+            if text and key is not None:
+                memo.put(key, text)
+            box.text = text or ""
+
+            dups = duplicates.get(key, ())
+            for dup_box in dups:
+                dup_box.text = box.text
+            advance(1 + len(dups))
+
+    return boxes
 
 class BatchThread(QThread):
     item_started = Signal(int, object)
     item_finished = Signal(int, object)
     all_done = Signal()
 
-    def __init__(self, app_ref, entries, parent=None):
+    def __init__(self, app_ref, entries, parent=None, pipeline=True,
+                 decode_workers=2, detect_workers=1, recognize_workers=1, queue_size=4,
+                 detect_batch_size=DETECT_BATCH_SIZE):
         super().__init__(parent)
         self.app_ref = app_ref
         self.entries = entries
+        self.pipeline = pipeline
+        self.decode_workers = decode_workers
+        self.detect_workers = detect_workers
+        self.recognize_workers = recognize_workers
+        self.queue_size = queue_size
+        self.detect_batch_size = detect_batch_size
 
     def run(self):
+        if self.pipeline:
+            self._run_pipeline()
+        else:
+            self._run_sequential()
+
+        self.all_done.emit()
+
+    def _run_pipeline(self):
+        from .pipeline import OCRPipeline
+
+        pipeline = OCRPipeline(
+            self.app_ref,
+            decode_workers=self.decode_workers,
+            detect_workers=self.detect_workers,
+            recognize_workers=self.recognize_workers,
+            queue_size=self.queue_size,
+            batch_size=OCRThread.batch_size,
+            detect_batch_size=self.detect_batch_size,
+        )
+
+        def on_started(idx, path):
+            self.item_started.emit(idx, path)
+
+        def on_finished(idx, path, boxes, frames, info):
+            self.item_finished.emit(idx, (boxes, frames))
+
+        pipeline.run(self.entries, on_started=on_started, on_finished=on_finished)
+
+    def _run_sequential(self):
         for idx, path in enumerate(self.entries):
             self.item_started.emit(idx, path)
 
@@ -162,5 +327,3 @@ class BatchThread(QThread):
             ocr_thread.finished.connect(on_finished)
             ocr_thread.run() 
             self.item_finished.emit(idx, result_container[0])
-
-        self.all_done.emit()
\ No newline at end of file
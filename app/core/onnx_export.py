@@ -0,0 +1,201 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+import torch
+from .recognizer import ONNX_CONFIG_NAME, PAST_KINDS, OnnxRecognizer, TorchRecognizer, dir_fingerprint, past_names
+
+OPSET = 17
+
+def export(model_dir, out_dir, opset=OPSET):
+    from transformers import AutoTokenizer, ViTImageProcessor, VisionEncoderDecoderModel
+
+    model_dir = Path(model_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    model = VisionEncoderDecoderModel.from_pretrained(str(model_dir)).eval()
+    processor = ViTImageProcessor.from_pretrained(str(model_dir))
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+    size = processor.size
+    height = size["height"] if isinstance(size, dict) else size
+    width = size["width"] if isinstance(size, dict) else size
+    pixel_values = torch.zeros((1, 3, height, width), dtype=torch.float32)
+
+    encoder = _EncoderWrapper(model).eval()
+    decoder_init = _DecoderInitWrapper(model).eval()
+    decoder_with_past = _DecoderWithPastWrapper(model).eval()
+    num_layers = model.decoder.config.num_hidden_layers
+    past = past_names(num_layers)
+    present = past_names(num_layers, "present")
+
+    past_axes = {}
+    for name in past + present:
+        past_axes[name] = {0: "batch", 2: "encoder_sequence" if "cross" in name else "past_sequence"}
+
+    with torch.no_grad():
+        hidden = encoder(pixel_values)
+        torch.onnx.export(
+            encoder, (pixel_values,), str(out_dir / "encoder.onnx"),
+            input_names=["pixel_values"], output_names=["encoder_hidden_states"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "encoder_hidden_states": {0: "batch"}},
+            opset_version=opset,
+        )
+
+        input_ids = torch.full((1, 1), model.config.decoder_start_token_id, dtype=torch.long)
+        torch.onnx.export(
+            decoder_init, (input_ids, hidden), str(out_dir / "decoder_init.onnx"),
+            input_names=["input_ids", "encoder_hidden_states"], output_names=["logits"] + present,
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "encoder_hidden_states": {0: "batch"},
+                "logits": {0: "batch", 1: "sequence"},
+                **{name: past_axes[name] for name in present},
+            },
+            opset_version=opset,
+        )
+
+        cache = decoder_init(input_ids, hidden)[1:]
+        torch.onnx.export(
+            decoder_with_past, (input_ids, hidden, *cache), str(out_dir / "decoder_with_past.onnx"),
+            input_names=["input_ids", "encoder_hidden_states"] + past, output_names=["logits"] + present,
+            dynamic_axes={
+                "input_ids": {0: "batch"},
+                "encoder_hidden_states": {0: "batch"},
+                "logits": {0: "batch"},
+                **past_axes,
+            },
+            opset_version=opset,
+        )
+
+    processor.save_pretrained(str(out_dir))
+    tokenizer.save_pretrained(str(out_dir))
+
+    config = {
+        "decoder_start_token_id": model.config.decoder_start_token_id,
+        "eos_token_id": model.config.eos_token_id if model.config.eos_token_id is not None
+        else tokenizer.sep_token_id,
+        "pad_token_id": model.config.pad_token_id if model.config.pad_token_id is not None
+        else tokenizer.pad_token_id,
+        "source": dir_fingerprint(model_dir),
+        "opset": opset,
+        "decoder_with_past": True,
+        "num_layers": num_layers,
+    }
+    with open(out_dir / ONNX_CONFIG_NAME, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    return out_dir
+
+def verify(model_dir, onnx_dir, images):
+    torch_rec = TorchRecognizer(model_dir, force_cpu=True)
+    onnx_rec = OnnxRecognizer(onnx_dir)
+
+    mismatches = []
+    for i, img in enumerate(images):
+        expected = torch_rec(img)
+        got = onnx_rec.recognize_batch([img])[0]
+        if expected != got:
+            mismatches.append((i, expected, got))
+    return mismatches
+
+def load_images(paths, limit=50):
+    from PIL import Image
+
+    images = []
+    for p in paths:
+        p = Path(p)
+        files = sorted(p.iterdir()) if p.is_dir() else [p]
+        for f in files:
+            if len(images) >= limit:
+                return images
+            try:
+                images.append(Image.open(f).convert("RGB"))
+            except Exception:
+                continue
+    return images
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.onnx_export",
+        description="Экспорт MangaOcr в ONNX (encoder/decoder) и сверка с PyTorch.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export")
+    p_export.add_argument("model_dir")
+    p_export.add_argument("out_dir")
+    p_export.add_argument("--opset", type=int, default=OPSET)
+
+    p_verify = sub.add_parser("verify")
+    p_verify.add_argument("model_dir")
+    p_verify.add_argument("onnx_dir")
+    p_verify.add_argument("images", nargs="+", help="кропы реплик (файлы или папки)")
+    p_verify.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        out = export(args.model_dir, args.out_dir, opset=args.opset)
+        print(f"Экспортировано в {out}")
+        return 0
+
+    images = load_images(args.images, limit=args.limit)
+    if not images:
+        print("Нет изображений для сверки", file=sys.stderr)
+        return 2
+    mismatches = verify(args.model_dir, args.onnx_dir, images)
+    for i, expected, got in mismatches:
+        print(f"#{i}: torch={expected!r} onnx={got!r}")
+    print(f"Совпало {len(images) - len(mismatches)} из {len(images)}")
+    return 1 if mismatches else 0
+
+class _EncoderWrapper(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+        self.proj = getattr(model, 'enc_to_dec_proj', None)
+
+    def forward(self, pixel_values):
+        hidden = self.encoder(pixel_values=pixel_values).last_hidden_state
+        if self.proj is not None:
+            hidden = self.proj(hidden)
+        return hidden
+
+class _DecoderInitWrapper(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.decoder
+
+    def forward(self, input_ids, encoder_hidden_states):
+        out = self.decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states, use_cache=True)
+        return (out.logits, *_flatten_past(out.past_key_values))
+
+class _DecoderWithPastWrapper(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.decoder
+
+    def forward(self, input_ids, encoder_hidden_states, *past):
+        out = self.decoder(
+            input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+            past_key_values=_nest_past(past), use_cache=True,
+        )
+        return (out.logits, *_flatten_past(out.past_key_values))
+
+def _flatten_past(past):
+    if hasattr(past, 'to_legacy_cache'):
+        past = past.to_legacy_cache()
+    return [t for layer in past for t in layer]
+
+def _nest_past(flat):
+    layers = tuple(tuple(flat[i:i + len(PAST_KINDS)]) for i in range(0, len(flat), len(PAST_KINDS)))
+    try:
+        from transformers.cache_utils import EncoderDecoderCache
+    except ImportError:
+        return layers
+    return EncoderDecoderCache.from_legacy_cache(layers)
+
+if __name__ == "__main__":
+    sys.exit(main())
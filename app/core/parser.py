@@ -1,17 +1,68 @@
+import io
+import os
+import threading
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
 from pathlib import Path
-from PySide6.QtCore import QThread
+from PySide6.QtCore import QThread, Signal
+from requests.adapters import HTTPAdapter
+from .utils import IMAGE_EXTENSIONS
+
+HEADER_CHUNK = 64 * 1024
+
+class DownloadCancelled(Exception):
+    pass
 
 class ImageParser(QThread):
-    def __init__(self, headers=None, timeout=10):
+    progress = Signal(int, int)
+    image_saved = Signal(int, object)
+    download_finished = Signal(list, object)
+    error = Signal(str)
+
+    def __init__(self, headers=None, timeout=10, max_workers=6, min_size=400):
         super().__init__()
         self.session = requests.Session()
         self.session.headers.update(headers or {
             "User-Agent": "Mozilla/5.0"
         })
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.timeout = timeout
+        self.max_workers = max_workers
+        self.min_size = min_size
+        self.url = None
+        self.out_dir = None
+        self._cancel = threading.Event()
+
+    def start_download(self, url, out_dir):
+        self.url = url
+        self.out_dir = Path(out_dir)
+        self._cancel.clear()
+        self.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            image_urls = self.extract_image_urls(self.url)
+            saved = self.download_images(
+                image_urls, self.out_dir,
+                on_progress=self.progress.emit, on_saved=self.image_saved.emit,
+            )
+        except DownloadCancelled:
+            return
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        if not self._cancel.is_set():
+            self.download_finished.emit(saved, self.out_dir)
 
     def get_soup(self, url: str):
         resp = self.session.get(url, timeout=self.timeout)
@@ -32,21 +83,94 @@ class ImageParser(QThread):
 
         return images
 
-    def download_images(self, image_urls, out_dir: str):
+    def download_images(self, image_urls, out_dir: str, on_progress=None, on_saved=None):
         out_path = Path(out_dir)
         out_path.mkdir(parents=True, exist_ok=True)
 
+        total = len(image_urls)
+        width = max(3, len(str(total)))
         saved = []
-        for i, url in enumerate(image_urls, start=1):
-            r = self.session.get(url, timeout=self.timeout)
+        ready = {}
+        next_page = 1
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="download") as pool:
+            futures = {
+                pool.submit(self.download_image, url, out_path, f"{i:0{width}}"): i
+                for i, url in enumerate(image_urls, start=1)
+            }
+            try:
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        filename = future.result()
+                    except DownloadCancelled:
+                        filename = None
+                    except Exception as e:
+                        print("Ошибка загрузки изображения:", e)
+                        filename = None
+                    if self._cancel.is_set():
+                        raise DownloadCancelled()
+
+                    done += 1
+                    ready[i] = filename
+                    while next_page in ready:
+                        filename = ready.pop(next_page)
+                        next_page += 1
+                        if filename is None:
+                            continue
+                        if on_saved is not None:
+                            on_saved(len(saved), filename)
+                        saved.append(filename)
+                    if on_progress is not None:
+                        on_progress(done, total)
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        return saved
+
+    def download_image(self, url, out_path, stem):
+        if self._cancel.is_set():
+            raise DownloadCancelled()
+
+        with self.session.get(url, timeout=self.timeout, stream=True) as r:
             r.raise_for_status()
+            data = bytearray()
+            size = None
+            fmt = None
+            for chunk in r.iter_content(HEADER_CHUNK):
+                if self._cancel.is_set():
+                    raise DownloadCancelled()
+                data.extend(chunk)
+                if size is None:
+                    size, fmt = image_header(data)
+                    if size is not None and not self._large_enough(size):
+                        return None
 
-            ext = url.split("?")[0].split(".")[-1]
-            filename = out_path / f"{i:03}.{ext}"
+        if size is None:
+            size, fmt = image_header(data)
+        if size is None or not self._large_enough(size):
+            return None
 
-            with open(filename, "wb") as f:
-                f.write(r.content)
+        ext = "." + url.split("?")[0].split(".")[-1].lower()
+        if ext not in IMAGE_EXTENSIONS:
+            ext = "." + ("jpg" if fmt == "JPEG" else (fmt or "png").lower())
 
-            saved.append(filename)
+        filename = out_path / f"{stem}{ext}"
+        part = filename.with_name(filename.name + ".part")
+        with open(part, "wb") as f:
+            f.write(data)
+        os.replace(part, filename)
+        return filename
 
-        return saved
+    def _large_enough(self, size):
+        return size[0] > self.min_size and size[1] > self.min_size
+
+def image_header(data):
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size, img.format
+    except Exception:
+        return None, None
@@ -0,0 +1,229 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .imaging import imread_unicode
+from .ocr import recognize_boxes, wait_for_recognizer
+from .detection import detect_text_boxes_batch, DETECT_BATCH_SIZE
+from .trace import tracer
+from .imagecache import decoded_images
+
+_DONE = object()
+
+class OCRPipeline:
+    def __init__(self, app_ref, decode_workers=2, detect_workers=1, recognize_workers=1,
+                 queue_size=4, batch_size=8, detect_batch_size=DETECT_BATCH_SIZE):
+        self.app_ref = app_ref
+        self.decode_workers = max(1, int(decode_workers))
+        self.detect_workers = max(1, int(detect_workers))
+        self.recognize_workers = max(1, int(recognize_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = batch_size
+        self.detect_batch_size = max(1, int(detect_batch_size))
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_stopped(self):
+        return self._stop.is_set()
+
+    def run(self, entries, on_started=None, on_finished=None):
+        decode_q = queue.Queue(self.queue_size)
+        recognize_q = queue.Queue(self.queue_size)
+        done_q = queue.Queue()
+        pool = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="ocr-decode")
+
+        detect_left = [self.detect_workers]
+        detect_left_lock = threading.Lock()
+
+        def feed():
+            count = 0
+            try:
+                for idx, path in enumerate(entries):
+                    if self._stop.is_set():
+                        break
+                    count = idx + 1
+                    if on_started is not None:
+                        on_started(idx, path)
+
+                    cached = self._cached(path)
+                    if cached is not None and not cached[2]:
+                        done_q.put((idx, path, cached[0], cached[1], {'timings': {}, 'cached': True}))
+                        continue
+
+                    future = pool.submit(self._decode, path)
+                    decode_q.put((idx, path, future, cached))
+            finally:
+                for _ in range(self.detect_workers):
+                    decode_q.put(_DONE)
+                done_q.put((_DONE, count))
+
+        def detect():
+            try:
+                finished = False
+                while not finished:
+                    items = [decode_q.get()]
+                    while items[-1] is not _DONE and len(items) < self.detect_batch_size:
+                        try:
+                            items.append(decode_q.get_nowait())
+                        except queue.Empty:
+                            break
+                    if items[-1] is _DONE:
+                        items.pop()
+                        finished = True
+                    if not items:
+                        continue
+                    try:
+                        self._detect_batch(items, recognize_q)
+                    except Exception as e:
+                        for idx, path, _, _ in items:
+                            recognize_q.put((idx, path, None, [], [], [], {'timings': {}, 'error': f"detect: {e}"}))
+            finally:
+                with detect_left_lock:
+                    detect_left[0] -= 1
+                    last = detect_left[0] == 0
+                if last:
+                    for _ in range(self.recognize_workers):
+                        recognize_q.put(_DONE)
+
+        def recognize():
+            while True:
+                item = recognize_q.get()
+                if item is _DONE:
+                    break
+                idx, path, img_cv, boxes, frames, pending, info = item
+                try:
+                    if img_cv is not None and not self._stop.is_set():
+                        mocr = wait_for_recognizer(self.app_ref, self._stop.is_set)
+                        t0 = time.perf_counter()
+                        recognize_boxes(mocr, img_cv, pending,
+                                        batch_size=self.batch_size, should_stop=self._stop.is_set)
+                        info['timings']['recognize'] = time.perf_counter() - t0
+                        tracer.record("recognize", t0, info['timings']['recognize'], page=idx, crops=len(pending))
+                        if not self._stop.is_set():
+                            self._store(path, boxes, frames, mocr is not None)
+                except Exception as e:
+                    boxes, frames = [], []
+                    info['error'] = f"recognize: {e}"
+                done_q.put((idx, path, boxes, frames, info))
+
+        workers = [threading.Thread(target=feed, name="ocr-feed", daemon=True)]
+        workers += [threading.Thread(target=detect, name=f"ocr-detect-{i}", daemon=True)
+                    for i in range(self.detect_workers)]
+        workers += [threading.Thread(target=recognize, name=f"ocr-recognize-{i}", daemon=True)
+                    for i in range(self.recognize_workers)]
+        for w in workers:
+            w.start()
+
+        total = None
+        next_idx = 0
+        ready = {}
+        try:
+            while total is None or next_idx < total:
+                item = done_q.get()
+                if item[0] is _DONE:
+                    total = item[1]
+                    continue
+                ready[item[0]] = item
+                while next_idx in ready:
+                    idx, path, boxes, frames, info = ready.pop(next_idx)
+                    if on_finished is not None and not self._stop.is_set():
+                        on_finished(idx, path, boxes, frames, info)
+                    next_idx += 1
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for w in workers:
+                w.join()
+            pool.shutdown(wait=True)
+
+        return next_idx
+
+    def _detect_batch(self, items, recognize_q):
+        decoded = []
+        known = {}
+        for idx, path, future, cached in items:
+            info = {'timings': {}}
+            if cached is not None:
+                known[idx] = cached
+                info['cached_boxes'] = True
+            try:
+                img_cv, info['timings']['decode'] = future.result()
+                if img_cv is None:
+                    info['error'] = "decode: не удалось прочитать изображение"
+            except Exception as e:
+                img_cv = None
+                info['error'] = f"decode: {e}"
+            decoded.append((idx, path, img_cv, info))
+
+        pages = [d for d in decoded if d[2] is not None and d[0] not in known]
+        detections = {}
+        if pages and not self._stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                results = detect_text_boxes_batch(
+                    getattr(self.app_ref, 'yolo_detector', None),
+                    [img_cv for _, _, img_cv, _ in pages],
+                    batch_size=self.detect_batch_size,
+                )
+                elapsed = (time.perf_counter() - t0) / len(pages)
+                tracer.record("detect_batch", t0, elapsed * len(pages), pages=len(pages))
+                for (idx, _, _, info), result in zip(pages, results):
+                    detections[idx] = result
+                    info['timings']['detect'] = elapsed
+            except Exception as e:
+                detections = {}
+                for _, _, _, info in pages:
+                    info['error'] = f"detect: {e}"
+
+        out = []
+        for idx, path, img_cv, info in decoded:
+            if img_cv is not None and idx in known:
+                boxes, frames, pending = known[idx][:3]
+            elif idx in detections:
+                boxes, frames = detections[idx]
+                pending = self._cached_texts(path, boxes)
+            else:
+                img_cv = None
+                boxes, frames, pending = [], [], []
+            out.append((idx, path, img_cv, boxes, frames, pending, info))
+        for item in out:
+            recognize_q.put(item)
+
+    def _decode(self, path):
+        t0 = time.perf_counter()
+        img_cv = decoded_images.peek(path)
+        if img_cv is None:
+            img_cv = imread_unicode(path)
+        elapsed = time.perf_counter() - t0
+        tracer.record("decode", t0, elapsed, path=path.name if hasattr(path, 'name') else path)
+        return img_cv, elapsed
+
+    def _cached(self, path):
+        cache = getattr(self.app_ref, 'ocr_cache', None)
+        if cache is None:
+            return None
+        try:
+            return cache.lookup_for_path(path)
+        except Exception:
+            return None
+
+    def _cached_texts(self, path, boxes):
+        cache = getattr(self.app_ref, 'ocr_cache', None)
+        if cache is None:
+            return boxes
+        try:
+            return cache.fill_texts_for_path(path, boxes)
+        except Exception:
+            return boxes
+
+    def _store(self, path, boxes, frames, recognized=True):
+        cache = getattr(self.app_ref, 'ocr_cache', None)
+        if cache is None:
+            return
+        try:
+            cache.set_for_path(path, boxes, frames, recognized)
+        except Exception:
+            pass
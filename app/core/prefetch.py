@@ -0,0 +1,98 @@
+from PySide6.QtCore import QThread, Signal
+from pathlib import Path
+import threading
+import time
+from .ocr import OCRThread, recognize_boxes
+from .imagecache import decoded_images
+from .detection import detect_text_boxes
+
+class PrefetchThread(QThread):
+    page_ready = Signal(object)
+
+    def __init__(self, app_ref, cpu_budget=0.5, parent=None):
+        super().__init__(parent)
+        self.app_ref = app_ref
+        self.cpu_budget = cpu_budget
+        self._cond = threading.Condition()
+        self._pending = []
+        self._current = None
+        self._cancel = threading.Event()
+        self._running = True
+
+    def schedule(self, paths):
+        paths = [Path(p) for p in paths]
+        with self._cond:
+            self._pending = paths
+            if self._current is not None and self._current not in paths:
+                self._cancel.set()
+            self._cond.notify_all()
+
+    def current_path(self):
+        with self._cond:
+            return self._current
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cancel.set()
+            self._cond.notify_all()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path = self._pending.pop(0)
+                self._current = path
+                self._cancel.clear()
+
+            t0 = time.perf_counter()
+            try:
+                self._prefetch(path)
+            except Exception as e:
+                print("Ошибка предзагрузки:", e)
+            finally:
+                with self._cond:
+                    self._current = None
+                self.page_ready.emit(path)
+            busy = time.perf_counter() - t0
+
+            self._throttle(busy)
+
+    def _throttle(self, busy):
+        budget = self.cpu_budget
+        if not budget or budget >= 1:
+            return
+        idle = busy * (1 - budget) / max(budget, 0.01)
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running, timeout=idle)
+
+    def _prefetch(self, path):
+        cache = getattr(self.app_ref, 'ocr_cache', None)
+        if cache is None:
+            return
+        img_cv = decoded_images.get(path)
+        if img_cv is None or self._cancel.is_set():
+            return
+        cached = cache.lookup_for_path(path)
+        if cached is not None and not cached[2]:
+            return
+
+        if cached is not None:
+            boxes, frames, pending = cached[:3]
+        else:
+            boxes, frames = detect_text_boxes(getattr(self.app_ref, 'yolo_detector', None), img_cv)
+            pending = cache.fill_texts_for_path(path, boxes)
+        if self._cancel.is_set():
+            return
+
+        mocr = getattr(self.app_ref, 'mocr', None)
+        recognize_boxes(mocr, img_cv, pending, batch_size=OCRThread.batch_size,
+                        should_stop=self._cancel.is_set)
+        if self._cancel.is_set():
+            return
+
+        cache.set_for_path(path, boxes, frames, mocr is not None)
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+RECOGNIZER_BACKENDS = ("torch", "onnx", "stub")
+ONNX_CONFIG_NAME = "recognizer.json"
+MAX_LENGTH = 300
+PAST_KINDS = ("self_key", "self_value", "cross_key", "cross_value")
+
+class Recognizer:
+    name = "base"
+
+    def __init__(self):
+        self.fingerprint = self.name
+
+    def __call__(self, img):
+        return self.recognize_batch([img])[0]
+
+    def recognize_batch(self, images):
+        raise NotImplementedError
+
+class TorchRecognizer(Recognizer):
+    name = "torch"
+
+    def __init__(self, model_dir, force_cpu=False):
+        from manga_ocr import MangaOcr
+
+        self.model_dir = str(model_dir)
+        self.mocr = MangaOcr(pretrained_model_name_or_path=self.model_dir, force_cpu=force_cpu)
+        self.fingerprint = f"torch:{dir_fingerprint(self.model_dir)}"
+
+    def __call__(self, img):
+        return self.mocr(img)
+
+    def recognize_batch(self, images):
+        return recognize_torch_batch(self.mocr, images)
+
+class OnnxRecognizer(Recognizer):
+    name = "onnx"
+
+    def __init__(self, onnx_dir, providers=None, num_threads=0, max_length=MAX_LENGTH):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer, ViTImageProcessor
+
+        self.onnx_dir = Path(onnx_dir)
+        with open(self.onnx_dir / ONNX_CONFIG_NAME, "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        providers = providers or ["CPUExecutionProvider"]
+
+        self.encoder = ort.InferenceSession(str(self.onnx_dir / "encoder.onnx"), options, providers=providers)
+        self.with_past = bool(self.config.get("decoder_with_past"))
+        if self.with_past:
+            self.decoder_init = ort.InferenceSession(
+                str(self.onnx_dir / "decoder_init.onnx"), options, providers=providers
+            )
+            self.decoder = ort.InferenceSession(
+                str(self.onnx_dir / "decoder_with_past.onnx"), options, providers=providers
+            )
+            self.past_names = past_names(self.config["num_layers"])
+        else:
+            self.decoder = ort.InferenceSession(str(self.onnx_dir / "decoder.onnx"), options, providers=providers)
+        self.processor = ViTImageProcessor.from_pretrained(str(self.onnx_dir))
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.onnx_dir))
+        self.max_length = max_length
+        self.fingerprint = f"onnx:{dir_fingerprint(self.onnx_dir)}"
+
+    def recognize_batch(self, images):
+        import numpy as np
+
+        if not images:
+            return []
+
+        pixel_values = self.processor(
+            [img.convert("L").convert("RGB") for img in images], return_tensors="np"
+        ).pixel_values.astype(np.float32)
+        hidden = self.encoder.run(None, {"pixel_values": pixel_values})[0]
+
+        if self.with_past:
+            ids = self._generate_with_past(hidden)
+        else:
+            ids = self._generate(hidden)
+
+        return [post_process(self.tokenizer.decode(row, skip_special_tokens=True)) for row in ids]
+
+    def _generate_with_past(self, hidden):
+        import numpy as np
+
+        start = self.config["decoder_start_token_id"]
+        eos = self.config["eos_token_id"]
+        pad = self.config["pad_token_id"]
+
+        ids = np.full((len(hidden), 1), start, dtype=np.int64)
+        done = np.zeros(len(hidden), dtype=bool)
+        logits, *past = self.decoder_init.run(None, {"input_ids": ids, "encoder_hidden_states": hidden})
+        for _ in range(self.max_length - 1):
+            next_ids = logits[:, -1].argmax(-1).astype(np.int64)
+            next_ids = np.where(done, pad, next_ids)
+            ids = np.concatenate([ids, next_ids[:, None]], axis=1)
+            done |= next_ids == eos
+            if done.all():
+                break
+            feed = {"input_ids": next_ids[:, None], "encoder_hidden_states": hidden}
+            feed.update(zip(self.past_names, past))
+            logits, *past = self.decoder.run(None, feed)
+        return ids
+
+    def _generate(self, hidden):
+        import numpy as np
+
+        start = self.config["decoder_start_token_id"]
+        eos = self.config["eos_token_id"]
+        pad = self.config["pad_token_id"]
+
+        ids = np.full((len(hidden), 1), start, dtype=np.int64)
+        done = np.zeros(len(hidden), dtype=bool)
+        for _ in range(self.max_length - 1):
+            logits = self.decoder.run(None, {"input_ids": ids, "encoder_hidden_states": hidden})[0]
+            next_ids = logits[:, -1].argmax(-1).astype(np.int64)
+            next_ids = np.where(done, pad, next_ids)
+            ids = np.concatenate([ids, next_ids[:, None]], axis=1)
+            done |= next_ids == eos
+            if done.all():
+                break
+        return ids
+
+class StubRecognizer(Recognizer):
+    name = "stub"
+
+    def __init__(self, text=None, latency=0.0, per_image_latency=0.0):
+        self.text = text
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.calls = 0
+        self.images = 0
+        self.fingerprint = f"stub:{text!r}"
+
+    def recognize_batch(self, images):
+        self.calls += 1
+        self.images += len(images)
+        delay = self.latency + self.per_image_latency * len(images)
+        if delay > 0:
+            time.sleep(delay)
+        if callable(self.text):
+            return [self.text(img) for img in images]
+        if self.text is not None:
+            return [self.text for _ in images]
+        return [f"{img.width}x{img.height}" for img in images]
+
+def create_recognizer(backend="torch", model_dir=None, onnx_dir=None, **kwargs):
+    if backend == "torch":
+        return TorchRecognizer(model_dir, **kwargs)
+    if backend == "onnx":
+        return OnnxRecognizer(onnx_dir, **kwargs)
+    if backend == "stub":
+        return StubRecognizer(**kwargs)
+    raise ValueError(f"Неизвестный распознаватель: {backend} (доступны: {', '.join(RECOGNIZER_BACKENDS)})")
+
+def recognize_batch(mocr, images):
+    if not images:
+        return []
+
+    batch_fn = getattr(mocr, 'recognize_batch', None)
+    if callable(batch_fn):
+        return list(batch_fn(images))
+
+    if not _supports_batching(mocr):
+        return [mocr(img) for img in images]
+
+    return recognize_torch_batch(mocr, images)
+
+def recognize_torch_batch(mocr, images):
+    import torch
+
+    pixel_values = torch.stack([mocr._preprocess(img.convert("L").convert("RGB")) for img in images])
+    with torch.inference_mode():
+        generated = mocr.model.generate(pixel_values.to(mocr.model.device), max_length=MAX_LENGTH).cpu()
+
+    texts = []
+    for ids in generated:
+        text = mocr.tokenizer.decode(ids, skip_special_tokens=True)
+        texts.append(post_process(text))
+    return texts
+
+def post_process(text):
+    import jaconv
+
+    text = "".join(text.split())
+    text = text.replace("…", "...")
+    text = re.sub("[・.]{2,}", lambda x: (x.end() - x.start()) * ".", text)
+    text = jaconv.h2z(text, ascii=True, digit=True)
+    return text
+
+def dir_fingerprint(path):
+    path = Path(path)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(path.name.encode())
+    if path.is_dir():
+        for f in sorted(path.iterdir()):
+            if not f.is_file():
+                continue
+            size = f.stat().st_size
+            h.update(f"{f.name}:{size}".encode())
+            if size < (1 << 20):
+                h.update(f.read_bytes())
+    return f"{path.name}:{h.hexdigest()}"
+
+def past_names(num_layers, prefix="past"):
+    return [f"{prefix}.{i}.{kind}" for i in range(num_layers) for kind in PAST_KINDS]
+
+def _supports_batching(mocr):
+    return all(hasattr(mocr, attr) for attr in ('model', 'tokenizer', '_preprocess'))
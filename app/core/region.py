@@ -0,0 +1,56 @@
+from PySide6.QtCore import QThread, Signal
+from pathlib import Path
+import threading
+from .ocr import recognize_boxes, wait_for_recognizer
+from .imagecache import decoded_images
+
+class RegionOCRThread(QThread):
+    region_ready = Signal(object, object)
+
+    def __init__(self, app_ref, parent=None):
+        super().__init__(parent)
+        self.app_ref = app_ref
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = True
+
+    def submit(self, path, box):
+        with self._cond:
+            self._pending.append((Path(path), box))
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify_all()
+
+    def is_stopped(self):
+        return not self._running
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path, box = self._pending.pop(0)
+
+            try:
+                self._recognize(path, box)
+            except Exception as e:
+                print("Ошибка распознавания области:", e)
+                continue
+            self.region_ready.emit(path, box)
+
+    def _recognize(self, path, box):
+        img_cv = decoded_images.get(path)
+        if img_cv is None:
+            raise ValueError(f"не удалось прочитать {path}")
+        mocr = wait_for_recognizer(self.app_ref, self.is_stopped)
+        if mocr is None:
+            raise RuntimeError("распознаватель не загружен")
+        recognize_boxes(mocr, img_cv, [box], batch_size=1)
+        if not box.text:
+            raise RuntimeError("пустой результат распознавания")
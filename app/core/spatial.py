@@ -0,0 +1,36 @@
+class BoxIndex:
+    def __init__(self, boxes=None, cell_size=256):
+        self.cell_size = cell_size
+        self.boxes = []
+        self.cells = {}
+        self.rebuild(boxes or [])
+
+    def rebuild(self, boxes):
+        self.boxes = list(boxes)
+        self.cells = {}
+        size = self.cell_size
+        for i, box in enumerate(self.boxes):
+            rect = getattr(box, 'rect', None)
+            if rect is None or rect.isEmpty():
+                continue
+            for cy in range(rect.top() // size, rect.bottom() // size + 1):
+                for cx in range(rect.left() // size, rect.right() // size + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    def candidates(self, x, y):
+        return self.cells.get((x // self.cell_size, y // self.cell_size), ())
+
+    def box_at(self, point):
+        x, y = point.x(), point.y()
+        for i in self.candidates(x, y):
+            box = self.boxes[i]
+            if box.rect.contains(point):
+                return box
+        return None
+
+    def boxes_at(self, point):
+        x, y = point.x(), point.y()
+        return [self.boxes[i] for i in self.candidates(x, y) if self.boxes[i].rect.contains(point)]
+
+    def __len__(self):
+        return len(self.boxes)
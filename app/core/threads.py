@@ -1,47 +1,127 @@
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from manga_ocr import MangaOcr
-from ultralytics import YOLO
-import numpy as np
-from PIL import Image
 from PySide6.QtCore import QThread, Signal
+from .recognizer import create_recognizer, recognize_batch
 
 def resource_path(relative_path):
     if hasattr(sys, '_internal'):
         return os.path.join(sys._internal, relative_path)
     return os.path.join(os.path.dirname(__file__), relative_path)
 
+WARMUP_PAGE_SHAPE = (1600, 1130, 3)
+WARMUP_CROP_SIZE = (96, 320)
+
+def model_paths(models_dir=None):
+    if models_dir is None:
+        models_dir = resource_path(Path("..", "..", "models"))
+    return {
+        "mocr": os.path.join(models_dir, "model_manga_ocr"),
+        "onnx": os.path.join(models_dir, "model_manga_ocr_onnx"),
+        "yolo": os.path.join(models_dir, "yolo_m.pt"),
+    }
+
+def load_detector(models_dir=None, warmup=True):
+    from ultralytics import YOLO
+
+    t0 = time.perf_counter()
+    yolo = YOLO(model_paths(models_dir)["yolo"])
+    t1 = time.perf_counter()
+
+    if warmup:
+        try:
+            import numpy as np
+            from .detection import detect_text_boxes
+
+            rng = np.random.default_rng(0)
+            page = np.full(WARMUP_PAGE_SHAPE, 255, dtype=np.uint8)
+            page[::7] = rng.integers(0, 255, page[::7].shape, dtype=np.uint8)
+            detect_text_boxes(yolo, page)
+        except Exception:
+            pass
+
+    return yolo, {"load": t1 - t0, "warmup": time.perf_counter() - t1}
+
+def load_recognizer(models_dir=None, recognizer_backend=None, warmup=True):
+    paths = model_paths(models_dir)
+    backend = recognizer_backend or os.environ.get("MANGAOCR_RECOGNIZER", "torch")
+
+    t0 = time.perf_counter()
+    mocr = create_recognizer(backend, model_dir=paths["mocr"], onnx_dir=paths["onnx"])
+    t1 = time.perf_counter()
+
+    if warmup:
+        try:
+            from PIL import Image
+            from .ocr import OCRThread
+
+            w, h = WARMUP_CROP_SIZE
+            crops = [Image.new('RGB', (w + 8 * i, h), (255, 255, 255)) for i in range(OCRThread.batch_size)]
+            recognize_batch(mocr, crops)
+        except Exception:
+            pass
+
+    return mocr, {"load": t1 - t0, "warmup": time.perf_counter() - t1}
+
+def load_models(models_dir=None, recognizer_backend=None, on_detector=None, on_recognizer=None, timings=None):
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="models-load") as pool:
+        detector_future = pool.submit(load_detector, models_dir)
+        recognizer_future = pool.submit(load_recognizer, models_dir, recognizer_backend)
+        callbacks = {detector_future: ("detector", on_detector), recognizer_future: ("recognizer", on_recognizer)}
+
+        errors = []
+        for future in as_completed(callbacks):
+            name, callback = callbacks[future]
+            try:
+                model, timing = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if timings is not None:
+                timings[name] = timing
+            if callback is not None:
+                callback(model, timing)
+
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return recognizer_future.result()[0], detector_future.result()[0]
+
 class ModelsLoadThread(QThread):
     finished = Signal(object, object) 
     error = Signal(str)
+    detector_ready = Signal(object)
+    recognizer_ready = Signal(object)
+    model_timing = Signal(str, float, float)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, recognizer_backend=None):
         super().__init__(parent)
+        self.recognizer_backend = recognizer_backend
+        self.detector = None
+        self.recognizer = None
 
     def run(self):
         try:
-            model_dir = resource_path(Path("..", "..", "models", "model_manga_ocr"))
-            mocr = MangaOcr(pretrained_model_name_or_path=model_dir)
+            from ..ignore import ignore_warnings
+            ignore_warnings()
 
-            yolo_model_path = resource_path(Path("..", "..", "models", "yolo_m.pt"))
-            yolo = YOLO(yolo_model_path)
+            def on_detector(yolo, timing):
+                self.detector = yolo
+                self.detector_ready.emit(yolo)
+                self.model_timing.emit("detector", timing["load"], timing["warmup"])
 
-            try:
-                dummy_img = np.zeros((64, 64, 3), dtype=np.uint8)
-                _ = yolo(dummy_img)
-            except Exception:
-                pass
+            def on_recognizer(mocr, timing):
+                self.recognizer = mocr
+                self.recognizer_ready.emit(mocr)
+                self.model_timing.emit("recognizer", timing["load"], timing["warmup"])
 
-            try:
-                dummy_pil = Image.new('RGB', (16, 16))
-                try:
-                    _ = mocr(dummy_pil)
-                except Exception:
-                    pass
-            except Exception:
-                pass
+            mocr, yolo = load_models(
+                recognizer_backend=self.recognizer_backend,
+                on_detector=on_detector,
+                on_recognizer=on_recognizer,
+            )
             self.finished.emit(mocr, yolo)
 
         except Exception as e:
-            self.error.emit(str(e))
\ No newline at end of file
+            self.error.emit(str(e))
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+class Tracer:
+    def __init__(self, enabled=False, path=None, window=200, max_events=200000):
+        self.enabled = enabled
+        self.path = path
+        self.window = window
+        self.max_events = max_events
+        self._events = deque(maxlen=max_events)
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def enable(self, path=None):
+        if path is not None:
+            self.path = path
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, into=None, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, into, args)
+
+    def record(self, name, start, duration, **args):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": "ocr",
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()}
+        with self._lock:
+            self._events.append(event)
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=self.window)
+            recent.append(duration)
+
+    def stats(self):
+        with self._lock:
+            recent = {name: sorted(values) for name, values in self._recent.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+            }
+            for name, values in recent.items() if values
+        }
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._recent.clear()
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            events = list(self._events)
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": thread_names[tid]}}
+            for tid in {e["tid"] for e in events} if tid in thread_names
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
+        return path
+
+class _Span:
+    __slots__ = ("tracer", "name", "into", "args", "start")
+
+    def __init__(self, tracer, name, into, args):
+        self.tracer = tracer
+        self.name = name
+        self.into = into
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if self.into is not None:
+            self.into[self.name] = self.into.get(self.name, 0.0) + duration
+        self.tracer.record(self.name, self.start, duration, **self.args)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+tracer = Tracer(enabled=bool(os.environ.get("MANGAOCR_TRACE")), path=os.environ.get("MANGAOCR_TRACE") or None)
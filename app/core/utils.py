@@ -1,21 +1,10 @@
 import re
-import cv2
-import numpy as np
-from PySide6.QtGui import QImage
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
 
 def natural_key(string):
     return [int(s) if s.isdigit() else s.lower() for s in re.split(r'(\d+)', string)]
 
-def pixmap_to_cv(pixmap):
-    qimg = pixmap.toImage().convertToFormat(QImage.Format.Format_RGB888)
-    width, height = qimg.width(), qimg.height()
-    ptr = qimg.bits()
-    data = ptr.tobytes() if hasattr(ptr, 'tobytes') else bytes(ptr)
-    bytes_per_line = qimg.bytesPerLine()
-    arr = np.frombuffer(data, np.uint8).reshape((height, bytes_per_line))
-    arr = arr[:, :width*3].reshape((height, width, 3))
-    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-
 class MangaTextBox:
     def __init__(self, rect, text):
         self.rect = rect
@@ -25,4 +14,69 @@ class ImageItem:
     def __init__(self, pixmap=None, path=None, name=None):
         self.pixmap = pixmap
         self.path = path
-        self.name = name
\ No newline at end of file
+        self.name = name
+
+def assign_frames(boxes, frames):
+    for box in boxes:
+        if getattr(box, 'frame_rect', None) is None:
+            box.frame_rect = None
+            for f in frames or []:
+                if f.rect.contains(box.rect.center()):
+                    box.frame_rect = f.rect
+                    break
+    return boxes
+
+def sort_reading_order(boxes):
+    frame_dict = {}
+    for box in boxes:
+        if hasattr(box, 'frame_rect') and box.frame_rect is not None:
+            f = box.frame_rect
+            key = (f.left(), f.top(), f.width(), f.height())
+            frame_dict.setdefault(key, []).append(box)
+
+    sorted_frame_keys = sort_frames_manga_style(list(frame_dict.keys()))
+    sorted_boxes = []
+    for key in sorted_frame_keys:
+        bxs = frame_dict[key]
+        sorted_boxes.extend(sort_boxes_with_tolerance(bxs))
+
+    unframed = [box for box in boxes if not hasattr(box, 'frame_rect') or box.frame_rect is None]
+    unframed_sorted = sorted(unframed, key=lambda b: (-b.rect.left(), b.rect.top()))
+    sorted_boxes.extend(unframed_sorted)
+    return sorted_boxes
+
+def sort_frames_manga_style(frames, overlap_threshold=5):
+    def is_same_row(f, row):
+        for r in row:
+            top1, bottom1 = f[1], f[1] + f[3]
+            top2, bottom2 = r[1], r[1] + r[3]
+            overlap = min(bottom1, bottom2) - max(top1, top2)
+            if overlap >= -overlap_threshold:
+                return True
+        return False
+
+    frames = sorted(frames, key=lambda f: f[1]) 
+    rows = []
+    for f in frames:
+        placed = False
+        for row in rows:
+            if is_same_row(f, row):
+                row.append(f)
+                placed = True
+                break
+        if not placed:
+            rows.append([f])
+
+    rows.sort(key=lambda row: min(f[1] for f in row))
+
+    sorted_result = []
+    for row in rows:
+        row_sorted = sorted(row, key=lambda f: -f[0])
+        sorted_result.extend(row_sorted)
+
+    return sorted_result
+
+def sort_boxes_with_tolerance(boxes, x_tolerance=20):
+    def box_key(b):
+        return (round(-b.rect.left() / x_tolerance), b.rect.top())
+    return sorted(boxes, key=box_key)
\ No newline at end of file
@@ -1,21 +1,16 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 from PySide6.QtCore import QUrl
-from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtCore import QTimer
 import json
 
 class JardicWidget:
     def __init__(self, parent=None):
         self.parent = parent
-        self.jardic_browser = QWebEngineView()
-        self.jardic_browser.setUrl(QUrl("https://jardic.ru/"))
-        self.jardic_browser.setVisible(False)
-        self.jardic_browser.setMinimumWidth(300)
+        self._browser = None
 
         self.jardic_wrapper = QWidget()
-        wrapper_layout = QVBoxLayout(self.jardic_wrapper)
-        wrapper_layout.setContentsMargins(0, 0, 0, 0)
-        wrapper_layout.addWidget(self.jardic_browser)
+        self._wrapper_layout = QVBoxLayout(self.jardic_wrapper)
+        self._wrapper_layout.setContentsMargins(0, 0, 0, 0)
         try:
             self.jardic_wrapper.setVisible(False)
         except Exception:
@@ -23,11 +18,35 @@ class JardicWidget:
 
         self._attached_to = None
         self._connected = False
-        try:
-            self.jardic_browser.loadFinished.connect(lambda ok: self.setup_jardic_style())
-            self._connected = True
-        except Exception:
-            pass
+        self._loaded = False
+        self._pending_text = None
+
+    @property
+    def jardic_browser(self):
+        return self._ensure_browser()
+
+    def _ensure_browser(self):
+        if self._browser is None:
+            from PySide6.QtWebEngineWidgets import QWebEngineView
+
+            self._browser = QWebEngineView()
+            self._browser.setUrl(QUrl("https://jardic.ru/"))
+            self._browser.setVisible(False)
+            self._browser.setMinimumWidth(300)
+            self._wrapper_layout.addWidget(self._browser)
+            try:
+                self._browser.loadFinished.connect(self._on_load_finished)
+                self._connected = True
+            except Exception:
+                pass
+        return self._browser
+
+    def _on_load_finished(self, ok):
+        self._loaded = True
+        self.setup_jardic_style()
+        text, self._pending_text = self._pending_text, None
+        if text is not None:
+            self._run_query(text)
 
     def setup_jardic_style(self):
         safe_css = json.dumps(jardic_css)  
@@ -84,7 +103,8 @@ class JardicWidget:
 
     def hide(self):
         try:
-            self.jardic_browser.setVisible(False)
+            if self._browser is not None:
+                self._browser.setVisible(False)
         except Exception:
             pass
         try:
@@ -93,7 +113,7 @@ class JardicWidget:
             pass
 
     def toggle(self, splitter=None, checked=None):
-        visible = self.jardic_browser.isVisible()
+        visible = self._browser is not None and self._browser.isVisible()
         target = (not visible) if checked is None else bool(checked)
         if target:
             self.show(splitter)
@@ -103,8 +123,18 @@ class JardicWidget:
     def send_text_to_jardic(self, text):
         try:
             splitter = getattr(self.parent, 'splitter', None)
-            if not self.jardic_browser.isVisible() and splitter is not None:
+            if (self._browser is None or not self._browser.isVisible()) and splitter is not None:
                 self.show(splitter)
+            if not self._loaded:
+                self._ensure_browser()
+                self._pending_text = text
+                return
+            self._run_query(text)
+        except Exception:
+            pass
+
+    def _run_query(self, text):
+        try:
             safe = text.replace('"', '\\"').replace('\n', ' ')
             js = f"""
                 (function() {{
@@ -1,25 +1,19 @@
 import re
 from pathlib import Path
-from docx import Document
 from PySide6.QtWidgets import (QMainWindow, QWidget, QListWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QSplitter, QToolBar, QFileDialog, QStatusBar, QGraphicsScene, QMenu,
-                               QInputDialog, QApplication)
-from PySide6.QtGui import QPixmap, QAction, QPainter, QPen, QColor
-from PySide6.QtCore import Qt, QPoint, QSettings, QSize
+                               QInputDialog, QApplication, QGraphicsRectItem, QGraphicsSimpleTextItem)
+from PySide6.QtGui import QPixmap, QAction, QPen, QColor, QFontMetrics
+from PySide6.QtCore import Qt, QPoint, QRectF, QSettings, QSize, QThread
 from .jardic import JardicWidget
 from .preview import ImageView
 from .textexportpanel import TextExportPanel
+from .timingspanel import TimingsPanel
 from ..core.cahcefolder import CacheFolder
-from ..core.cache import OCRCache
-from ..core.utils import natural_key
+from ..core.cache import OCRCache, crop_memo
+from ..core.trace import tracer
+from ..core.utils import natural_key, IMAGE_EXTENSIONS
 from ..core.threads import ModelsLoadThread
-from ..core.ocr import OCRThread, BatchThread
-from ..core.parser import ImageParser
-from ..ignore import ignore_warnings
-
-ignore_warnings()
-
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
 
 class MainWindow(QMainWindow):
     __version__ = "Alpha 0.2.1"
@@ -40,9 +34,42 @@ class MainWindow(QMainWindow):
 
         self.mocr = None
         self.yolo_detector = None
-        self.ocr_cache = OCRCache()
-        
-        self.parser = ImageParser()
+        self.prefetcher = None
+        self._awaiting_prefetch = None
+        self.ocr_thread = None
+        self._retired_ocr_threads = []
+        self.region_worker = None
+        self.ocr_cache = OCRCache(max_entries=self.settings.value("ocr_cache_max_entries", 5000, type=int))
+        crop_memo.max_entries = self.settings.value("crop_memo_entries", crop_memo.max_entries, type=int)
+        self._parser = None
+        self._retired_parsers = []
+        self._import_folder = None
+        self._decoded_images = None
+        self._preview_path = None
+        self._overlay_items = []
+        self._frame_items = []
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            from ..core.parser import ImageParser
+            self._parser = ImageParser(max_workers=self.settings.value("download_workers", 6, type=int))
+            self._parser.progress.connect(self._on_parser_progress)
+            self._parser.image_saved.connect(self._on_parser_image_saved)
+            self._parser.download_finished.connect(self._on_parser_finished)
+            self._parser.error.connect(self._on_parser_error)
+        return self._parser
+
+    @property
+    def decoded_images(self):
+        return self._ensure_decoded_images()
+
+    def _ensure_decoded_images(self):
+        if getattr(self, '_decoded_images', None) is None:
+            from ..core.imagecache import decoded_images
+            decoded_images.max_bytes = self.settings.value("decoded_cache_mb", 512, type=int) * 1024 * 1024
+            self._decoded_images = decoded_images
+        return self._decoded_images
 
     def restore_window_state(self):
         size = self.settings.value("window_size", QSize(1000, 700), type=QSize)
@@ -62,18 +89,84 @@ class MainWindow(QMainWindow):
             self.settings.setValue("window_size", self.size())
             self.settings.setValue("window_pos", self.pos())
 
+        prefetcher = getattr(self, 'prefetcher', None)
+        if prefetcher is not None:
+            prefetcher.stop()
+            prefetcher.wait()
+
+        self._cancel_ocr()
+        for thread in self._retired_ocr_threads:
+            thread.wait()
+
+        if self.region_worker is not None:
+            self.region_worker.stop()
+            self.region_worker.wait()
+
+        self._retire_parser()
+        for parser in self._retired_parsers:
+            try:
+                parser.wait()
+            except RuntimeError:
+                pass
+
+        self.ocr_cache.close()
+        if tracer.enabled and tracer.path:
+            try:
+                tracer.save()
+            except Exception as e:
+                print("Ошибка сохранения трассы:", e)
         super().closeEvent(event)
 
     def start_models_load(self):
-        self.models_thread = ModelsLoadThread()
+        from ..core.detection import set_detect_resolution, set_tiling
+        set_detect_resolution(self.settings.value("detect_max_short_side", None))
+        set_tiling(
+            max_aspect=self.settings.value("detect_tile_max_aspect", None),
+            max_pixels=self.settings.value("detect_tile_max_pixels", None),
+            tile_size=self.settings.value("detect_tile_size", None),
+            overlap=self.settings.value("detect_tile_overlap", None),
+        )
+
+        self.models_thread = ModelsLoadThread(
+            recognizer_backend=self.settings.value("recognizer_backend", "", type=str) or None
+        )
+        self.models_thread.detector_ready.connect(self.on_detector_loaded)
+        self.models_thread.recognizer_ready.connect(self.on_recognizer_loaded)
+        self.models_thread.model_timing.connect(self.on_model_timing)
         self.models_thread.finished.connect(self.on_models_loaded)
         self.models_thread.error.connect(lambda e: print("Ошибка загрузки моделей:", e))
         self.models_thread.start()
 
+    def on_detector_loaded(self, yolo):
+        self.yolo_detector = yolo
+        self.ocr_cache.set_models(detector=yolo)
+        if self.mocr is None:
+            self.statusBar().showMessage("Детектор загружен, загружается распознаватель...")
+
+    def on_recognizer_loaded(self, mocr):
+        self.mocr = mocr
+        self.ocr_cache.set_models(recognizer=mocr)
+
+    def on_model_timing(self, name, load, warmup):
+        print(f"Модель {name}: загрузка {load:.2f} с, прогрев {warmup:.2f} с")
+
     def on_models_loaded(self, mocr, yolo):
         self.mocr = mocr
         self.yolo_detector = yolo
+        self.ocr_cache.set_models(detector=yolo, recognizer=mocr)
         self.statusBar().showMessage("Модели успешно загружены")
+        self.start_prefetcher()
+
+    def start_prefetcher(self):
+        if not self.settings.value("prefetch_enabled", True, type=bool):
+            return
+        if getattr(self, 'prefetcher', None) is not None:
+            return
+        from ..core.prefetch import PrefetchThread
+        self._ensure_decoded_images()
+        self.prefetcher = PrefetchThread(self, cpu_budget=self.settings.value("prefetch_cpu_budget", 0.5, type=float))
+        self.prefetcher.page_ready.connect(self._on_prefetch_ready)
+        self.prefetcher.start(QThread.LowPriority)
 
     def _create_actions(self):
         self.open_folder_act = QAction("Открыть папку", self)
@@ -92,6 +185,11 @@ class MainWindow(QMainWindow):
         self.show_frames_toggle.triggered.connect(self.toggle_show_frames)
 
         self.show_frames_menu.addAction(self.show_frames_toggle)
+
+        self.timings_toggle = QAction("Тайминги этапов", self, checkable=True)
+        self.timings_toggle.setChecked(False)
+        self.timings_toggle.triggered.connect(self.toggle_timings_panel)
+        self.show_frames_menu.addAction(self.timings_toggle)
         self.show_frames_act.setMenu(self.show_frames_menu)
 
         self.jardic_act = QAction("Jardic", self)
@@ -173,6 +271,11 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
+        self.timings_panel = TimingsPanel()
+        self.timings_panel.setMinimumWidth(220)
+        self.timings_panel.hide()
+        splitter.addWidget(self.timings_panel)
+
         try:
             self.splitter.setSizes([300, 800, 250, 1])
         except Exception:
@@ -237,50 +340,113 @@ class MainWindow(QMainWindow):
         else:
             self.statusBar().showMessage("Буфер обмена не является ни URL, ни путём")
 
-    def action_parser(self):
-        url, ok = QInputDialog.getText(self, "Загрузить изображения из URL", "Введите URL страницы:")
-        if not ok or not url.strip():
-            return
+    def action_parser(self, url=None):
+        if not isinstance(url, str) or not url.strip():
+            url, ok = QInputDialog.getText(self, "Загрузить изображения из URL", "Введите URL страницы:")
+            if not ok or not url.strip():
+                return
+        url = url.strip()
+
+        self._retire_parser()
+
+        safe_name = re.sub(r"[<>:\"/\\|?*]", "_", url.replace("http://", "").replace("https://", ""))
+        out_dir = Path("MangaOCR_downloads", safe_name)
 
         self.statusBar().showMessage("Загрузка изображений...")
-        try:
-            image_urls = self.parser.extract_image_urls(url.strip())
-            filtered_urls = []
-            for img_url in image_urls:
-                try:
-                    resp = self.parser.session.get(img_url, timeout=self.parser.timeout)
-                    resp.raise_for_status()
-                    img = QPixmap()
-                    img.loadFromData(resp.content)
-                    if img.width() > 400 and img.height() > 400:
-                        filtered_urls.append(img_url)
-                except Exception:
-                    continue
-            if not filtered_urls:
-                self.statusBar().showMessage("Не найдено изображений на странице.")
-                return
+        self.parser.start_download(url, out_dir)
 
-            safe_name = re.sub(r"[<>:\"/\\|?*]", "_", url.strip().replace("http://", "").replace("https://", ""))
-            out_dir = Path("MangaOCR_downloads", safe_name)
-            out_dir.mkdir(parents=True, exist_ok=True) 
+    def _retire_parser(self):
+        parser = self._parser
+        if parser is None or not parser.isRunning():
+            return
+        self._parser = None
+        parser.cancel()
+        for signal in (parser.progress, parser.image_saved, parser.download_finished, parser.error):
+            try:
+                signal.disconnect()
+            except Exception:
+                pass
+        parser.finished.connect(parser.deleteLater)
+        if parser.isFinished():
+            parser.deleteLater()
 
-            saved_files = self.parser.download_images(filtered_urls, out_dir)
-            self.cache_folder.add(Path(out_dir))
-            self.load_folder(Path(out_dir))
-            self.statusBar().showMessage(f"Загружено {len(saved_files)} изображений в {out_dir}")
+        alive = []
+        for p in self._retired_parsers:
+            try:
+                if p.isRunning():
+                    alive.append(p)
+            except RuntimeError:
+                pass
+        self._retired_parsers = alive + [parser]
 
-        except Exception as e:
-            self.statusBar().showMessage(f"Ошибка при загрузке изображений: {e}")
+    def _from_current_parser(self):
+        sender = self.sender()
+        return sender is None or sender is self._parser
+
+    def _on_parser_progress(self, done, total):
+        if not self._from_current_parser():
+            return
+        self.statusBar().showMessage(f"Загрузка изображений: {done}/{total}")
+
+    def _on_parser_image_saved(self, idx, path):
+        path = Path(path)
+        if not self._from_current_parser():
+            return
+        if idx == 0:
+            self._begin_import(path.parent)
+        elif self._import_folder != path.parent or idx != len(self.entries):
+            return
+
+        self.entries.append(path)
+        self.list_widget.addItem(path.name)
+
+        if idx == 0:
+            self.list_widget.setCurrentRow(0)
+            if self.yolo_detector is None:
+                self.show_preview(path, reset_zoom=True)
+            else:
+                self.on_item_clicked(self.list_widget.item(0))
+        else:
+            self._schedule_prefetch(max(0, self.list_widget.currentRow()))
+
+    def _begin_import(self, folder):
+        self.current_folder = folder
+        self.entries = []
+        self._import_folder = folder
+        self._preview_path = None
+        if self.prefetcher is not None:
+            self.prefetcher.schedule([])
+        self.list_widget.clear()
+
+    def _on_parser_finished(self, saved_files, out_dir):
+        if not self._from_current_parser():
+            return
+        self._import_folder = None
+        if not saved_files:
+            self.statusBar().showMessage("Не найдено изображений на странице.")
+            return
+        self.cache_folder.add(Path(out_dir))
+        self.statusBar().showMessage(f"Загружено {len(saved_files)} изображений в {out_dir}")
+
+    def _on_parser_error(self, message):
+        if not self._from_current_parser():
+            return
+        self._import_folder = None
+        self.statusBar().showMessage(f"Ошибка при загрузке изображений: {message}")
+
+    def toggle_timings_panel(self, checked):
+        if checked:
+            tracer.enable()
+            self.timings_panel.show()
+        else:
+            self.timings_panel.hide()
+            if not tracer.path:
+                tracer.disable()
 
     def toggle_show_frames(self, checked):
         self.show_frames = checked
-        current_index = self.list_widget.currentRow()
-        if current_index >= 0:
-            self.show_preview(
-                self.entries[current_index],
-                boxes=getattr(self, 'text_boxes', None),
-                frames=getattr(self, 'frames', None)
-            )
+        for item in getattr(self, '_frame_items', []):
+            item.setVisible(checked)
 
     def update_recent_menu(self):
         self.recent_menu.clear()
@@ -299,11 +465,17 @@ class MainWindow(QMainWindow):
             return
 
         self.current_folder = folder
+        self._import_folder = None
+        self._retire_parser()
         self.entries = [
             p for p in sorted(folder.iterdir(), key=lambda x: natural_key(x.name))
             if p.suffix.lower() in IMAGE_EXTENSIONS
         ]
 
+        self._preview_path = None
+        if self.prefetcher is not None:
+            self.prefetcher.schedule([])
+
         self.list_widget.clear()
         for p in self.entries:
             self.list_widget.addItem(p.name)
@@ -323,26 +495,82 @@ class MainWindow(QMainWindow):
         self.show_preview(path, reset_zoom=True) 
 
         self._current_image_token = object()
+        self._awaiting_prefetch = None
         if hasattr(self, 'ocr_cache'):
             try:
                 cached = self.ocr_cache.get_for_path(path)
             except Exception:
                 cached = None
             if cached:
-                boxes, frames, md5 = cached
-                self.text_boxes, self.frames = boxes, frames
-                self.show_preview(path, boxes=self.text_boxes, frames=self.frames, reset_zoom=False)
-                self.text_export_panel.set_boxes(self.text_boxes, frames=self.frames, path=self.entries[idx])
+                self._cancel_ocr()
+                self._show_cached(idx, cached)
+                self._schedule_prefetch(idx)
                 return
 
-        if hasattr(self, 'ocr_thread') and self.ocr_thread is not None:
-            self.ocr_thread.quit()
-            self.ocr_thread.wait()
+        prefetcher = getattr(self, 'prefetcher', None)
+        if prefetcher is not None and prefetcher.current_path() == path:
+            self._cancel_ocr()
+            self._awaiting_prefetch = path
+            self._schedule_prefetch(idx, keep=path)
+            return
+
+        self._start_ocr(path)
+        self._schedule_prefetch(idx)
+
+    def _start_ocr(self, path):
+        from ..core.ocr import OCRThread
+
+        self._cancel_ocr()
 
         self.ocr_thread = OCRThread(self, path, token=self._current_image_token)
         self.ocr_thread.finished.connect(self.on_ocr_finished)
+        self.ocr_thread.timings.connect(self.timings_panel.on_timings)
         self.ocr_thread.start()
 
+    def _cancel_ocr(self):
+        retired = [t for t in getattr(self, '_retired_ocr_threads', []) if t.isRunning()]
+        thread = getattr(self, 'ocr_thread', None)
+        if thread is not None and thread.isRunning():
+            thread.cancel()
+            retired.append(thread)
+        self._retired_ocr_threads = retired
+        self.ocr_thread = None
+
+    def _show_cached(self, idx, cached):
+        boxes, frames, md5 = cached
+        self.text_boxes, self.frames = boxes, frames
+        self.show_preview(self.entries[idx], boxes=self.text_boxes, frames=self.frames, reset_zoom=False)
+        self.text_export_panel.set_boxes(self.text_boxes, frames=self.frames, path=self.entries[idx])
+
+    def _schedule_prefetch(self, idx, keep=None):
+        prefetcher = getattr(self, 'prefetcher', None)
+        if prefetcher is None:
+            return
+        ahead = self.settings.value("prefetch_ahead", 2, type=int)
+        behind = self.settings.value("prefetch_behind", 1, type=int)
+        paths = [keep] if keep is not None else []
+        paths += self.entries[idx + 1:idx + 1 + max(0, ahead)]
+        paths += list(reversed(self.entries[max(0, idx - max(0, behind)):idx]))
+        if self._import_folder is not None:
+            paths += self.entries[idx + 1 + max(0, ahead):]
+        prefetcher.schedule(paths)
+
+    def _on_prefetch_ready(self, path):
+        if self._awaiting_prefetch is None or path != self._awaiting_prefetch:
+            return
+        self._awaiting_prefetch = None
+        idx = self.list_widget.currentRow()
+        if idx < 0 or idx >= len(self.entries) or self.entries[idx] != path:
+            return
+        try:
+            cached = self.ocr_cache.get_for_path(path)
+        except Exception:
+            cached = None
+        if cached:
+            self._show_cached(idx, cached)
+        else:
+            self._start_ocr(path)
+
     def next_image(self):
         current_index = self.list_widget.currentRow()
         if current_index < len(self.entries) - 1:
@@ -356,7 +584,17 @@ class MainWindow(QMainWindow):
             self.on_item_clicked(self.list_widget.currentItem())
 
     def action_batch_process(self):
-        self.batch_thread = BatchThread(self, self.entries, parent=self)
+        from ..core.ocr import BatchThread
+
+        self.batch_thread = BatchThread(
+            self, self.entries, parent=self,
+            pipeline=self.settings.value("batch_pipeline", True, type=bool),
+            decode_workers=self.settings.value("batch_decode_workers", 2, type=int),
+            detect_workers=self.settings.value("batch_detect_workers", 1, type=int),
+            recognize_workers=self.settings.value("batch_recognize_workers", 1, type=int),
+            queue_size=self.settings.value("batch_queue_size", 4, type=int),
+            detect_batch_size=self.settings.value("batch_detect_batch_size", 4, type=int),
+        )
 
         self.batch_thread.item_started.connect(self._on_batch_item_started)
         self.batch_thread.item_finished.connect(self._on_batch_item_finished)
@@ -372,11 +610,14 @@ class MainWindow(QMainWindow):
         boxes, frames = result
         self.text_boxes, self.frames = boxes, frames
         self.text_export_panel.set_boxes(boxes, frames=frames)
-        self.show_preview(self.entries[idx], boxes=boxes, frames=frames, reset_zoom=False)
+        self.show_preview(self.entries[idx], boxes=boxes, frames=frames, reset_zoom=False, store=False)
         self.statusBar().showMessage(f"Завершено: {self.entries[idx]} ({idx+1}/{len(self.entries)})")
 
     def _on_batch_done(self):
-        self.statusBar().showMessage("Пакетная обработка завершена")
+        stats = crop_memo.stats()
+        self.statusBar().showMessage(
+            f"Пакетная обработка завершена (повторы кропов: {stats['hits']}, {stats['hit_rate']:.0%})"
+        )
 
     def action_export_text(self):
         if not hasattr(self, 'ocr_cache') or not self.entries:
@@ -389,6 +630,8 @@ class MainWindow(QMainWindow):
         if not filename:
             return
 
+        from docx import Document
+
         doc = Document()
 
         for path in self.entries:
@@ -412,61 +655,106 @@ class MainWindow(QMainWindow):
         self.text_boxes = boxes
         self.frames = frames
 
-        if hasattr(self, 'ocr_cache'):
-            try:
-                path = self.entries[self.list_widget.currentRow()]
-                self.ocr_cache.set_for_path(path, boxes, frames)
-            except Exception:
-                pass
-
         self.show_preview(self.entries[self.list_widget.currentRow()], boxes=boxes, reset_zoom=False, frames=frames)
         self.text_export_panel.set_boxes(boxes, frames=frames)
 
-    def show_preview(self, path: Path, boxes=None, frames=None, reset_zoom=False):
-        self.preview_view.text_boxes = boxes
-        
+    def recognize_region(self, path, box):
+        if self.region_worker is None:
+            from ..core.region import RegionOCRThread
+            self.region_worker = RegionOCRThread(self)
+            self.region_worker.region_ready.connect(self._on_region_ready)
+            self.region_worker.start()
+        self.region_worker.submit(path, box)
+
+    def _on_region_ready(self, path, box):
+        box.pending = False
+        try:
+            self.ocr_cache.update_box_for_path(path, box)
+        except Exception:
+            pass
+
         try:
-            pixmap_to_show = QPixmap(str(path))
-            with QPainter(pixmap_to_show) as painter:
-                if frames and getattr(self, 'show_frames', False):
-                    for f in frames:
-                        rect = getattr(f, 'rect', f)
-                        pen = QPen(QColor(0, 200, 0, 180), 3)
-                        painter.setPen(pen)
-                        painter.setBrush(QColor(0, 200, 0, 40))
-                        painter.drawRect(rect)
-                
-                if boxes:
-                    for box in boxes:
-                        pen = QPen(QColor(0, 160, 230, 180), 3)
-                        painter.setPen(pen)
-                        painter.setBrush(QColor(0, 160, 230, 40))
-                        painter.drawRect(box.rect)
-                        rect = box.rect.adjusted(2, 2, -2, -2)
-                        metrics = painter.fontMetrics()
-                        elided_text = metrics.elidedText(box.text, Qt.ElideRight, rect.width())
-                        painter.drawText(rect.topLeft() + QPoint(2, metrics.ascent() + 2), elided_text)
+            current = self.entries[self.list_widget.currentRow()]
+        except Exception:
+            current = None
+        if current != path:
+            return
+
+        frames = getattr(self, 'frames', None)
+        self.text_export_panel.set_boxes(self.text_boxes, frames=frames, path=path)
+        self.show_preview(path, boxes=self.text_boxes, frames=frames, reset_zoom=False)
+
+    def show_preview(self, path: Path, boxes=None, frames=None, reset_zoom=False, store=True):
+        self.preview_view.text_boxes = boxes
 
+        try:
+            if path != getattr(self, '_preview_path', None) or getattr(self, 'current_pixmap_item', None) is None:
+                try:
+                    qimg = self.decoded_images.qimage(path, store=store)
+                except Exception:
+                    qimg = None
+                pixmap = QPixmap.fromImage(qimg) if qimg is not None else QPixmap(str(path))
                 if getattr(self, 'current_pixmap_item', None):
-                    self.current_pixmap_item.setPixmap(pixmap_to_show)
+                    self.current_pixmap_item.setPixmap(pixmap)
                 else:
-                    self.current_pixmap_item = self.scene.addPixmap(pixmap_to_show)
+                    self.current_pixmap_item = self.scene.addPixmap(pixmap)
 
                 try:
-                    self.scene.setSceneRect(pixmap_to_show.rect())
+                    self.scene.setSceneRect(QRectF(pixmap.rect()))
                 except Exception:
                     pass
 
-                if reset_zoom:
-                    try:
-                        self.preview_view._fit_enabled = True
-                        self.preview_view._zoom = 1.0
-                    except Exception:
-                        pass
-                    self.preview_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+                self._preview_path = path
+                self.last_pixmap_for_cache = pixmap
+
+            self._set_overlays(boxes, frames)
+
+            if reset_zoom:
+                try:
+                    self.preview_view._fit_enabled = True
+                    self.preview_view._zoom = 1.0
+                except Exception:
+                    pass
+                self.preview_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
 
-                self.last_pixmap_for_cache = pixmap_to_show
-                self.statusBar().showMessage(str(path))
+            self.statusBar().showMessage(str(path))
 
         except Exception as e:
-            self.statusBar().showMessage(f"Ошибка отображения превью: {e}")
\ No newline at end of file
+            self.statusBar().showMessage(f"Ошибка отображения превью: {e}")
+
+    def _set_overlays(self, boxes, frames):
+        for item in getattr(self, '_overlay_items', []):
+            self.scene.removeItem(item)
+        self._overlay_items = []
+        self._frame_items = []
+
+        show_frames = getattr(self, 'show_frames', False)
+        for f in frames or []:
+            item = QGraphicsRectItem(QRectF(getattr(f, 'rect', f)))
+            item.setPen(QPen(QColor(0, 200, 0, 180), 3))
+            item.setBrush(QColor(0, 200, 0, 40))
+            item.setZValue(1)
+            item.setVisible(show_frames)
+            self.scene.addItem(item)
+            self._overlay_items.append(item)
+            self._frame_items.append(item)
+
+        font = self.preview_view.font()
+        metrics = QFontMetrics(font)
+        color = QColor(0, 160, 230, 180)
+        for box in boxes or []:
+            item = QGraphicsRectItem(QRectF(box.rect))
+            item.setPen(QPen(color, 3))
+            item.setBrush(QColor(0, 160, 230, 40))
+            item.setZValue(2)
+
+            rect = box.rect.adjusted(2, 2, -2, -2)
+            elided_text = metrics.elidedText(box.text or "", Qt.ElideRight, rect.width())
+            if elided_text:
+                label = QGraphicsSimpleTextItem(elided_text, item)
+                label.setFont(font)
+                label.setBrush(color)
+                label.setPos(rect.left() + 2, rect.top() + 2)
+
+            self.scene.addItem(item)
+            self._overlay_items.append(item)
\ No newline at end of file
@@ -2,10 +2,7 @@ from PySide6.QtWidgets import QGraphicsView, QLabel
 from PySide6.QtCore import Qt, QTimer, QRect, QRectF
 from PySide6.QtGui import QPainter, QCursor, QGuiApplication, QPen, QColor
 from PySide6.QtGui import QBrush
-from ..core.ocr import OCRThread
-from ..core.utils import pixmap_to_cv
-from PIL import Image
-import cv2
+from ..core.spatial import BoxIndex
 
 class ImageView(QGraphicsView):
     def __init__(self, *args, **kwargs):
@@ -21,13 +18,13 @@ class ImageView(QGraphicsView):
         self._fit_enabled = True
         self._zoom = 1.0
 
-        self.hover_timer = QTimer()
-        self.hover_timer.timeout.connect(self.check_hover)
-        self.hover_timer.start(30)
-        self.hover_timer.setParent(self)
+        self.setMouseTracking(True)
+        self.viewport().setMouseTracking(True)
 
         self.hand_mode = False
-        self.text_boxes = [] 
+        self._text_boxes = []
+        self._box_index = BoxIndex()
+        self._hovered_box = None
         self._creating_box = False
         self._create_start_scene_pos = None
         self._rubber_rect = None
@@ -46,36 +43,56 @@ class ImageView(QGraphicsView):
         self._last_pan_pos = None
         self.setCursor(Qt.ArrowCursor)
 
-    def closeEvent(self, event):
-        self.hover_timer.stop()
-        super().closeEvent(event)
-
-    def check_hover(self):
-        if self.scene() is None or not self.text_boxes:
+    @property
+    def text_boxes(self):
+        return self._text_boxes
+
+    @text_boxes.setter
+    def text_boxes(self, boxes):
+        self._text_boxes = boxes if boxes is not None else []
+        self._box_index.rebuild(self._text_boxes)
+        self.check_hover()
+
+    def box_at(self, scene_point):
+        return self._box_index.box_at(scene_point)
+
+    def check_hover(self, vp_pos=None):
+        if vp_pos is None:
+            vp_pos = self.viewport().mapFromGlobal(QCursor.pos())
+            if not self.viewport().rect().contains(vp_pos):
+                vp_pos = None
+
+        box = None
+        if vp_pos is not None and self.scene() is not None and self._text_boxes:
+            box = self.box_at(self.mapToScene(vp_pos).toPoint())
+
+        if box is None:
+            if self._hovered_box is not None:
+                self._hovered_box = None
+                self.hovered_text.hide()
             return
 
-        vp_pos = self.viewport().mapFromGlobal(QCursor.pos())
-        scene_pos = self.mapToScene(vp_pos)
+        if box is not self._hovered_box or self.hovered_text.text() != box.text:
+            self._hovered_box = box
+            self.hovered_text.setText(box.text)
+            self.hovered_text.adjustSize()
+        self.hovered_text.move(int(vp_pos.x() + 15), int(vp_pos.y() + 15))
+        self.hovered_text.show()
 
-        hovered = False
-        for box in self.text_boxes:
-            if box.rect.contains(scene_pos.toPoint()):
-                self.hovered_text.setText(box.text)
-                self.hovered_text.adjustSize()
-                x = vp_pos.x() + 15
-                y = vp_pos.y() + 15
-                self.hovered_text.move(int(x), int(y))
-                self.hovered_text.show()
-                hovered = True
-                break
+    def leaveEvent(self, event):
+        self._hovered_box = None
+        self.hovered_text.hide()
+        super().leaveEvent(event)
 
-        if not hovered:
-            self.hovered_text.hide()
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.check_hover()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if self._fit_enabled:
             self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self.check_hover()
 
     def wheelEvent(self, event):
         self._fit_enabled = False
@@ -88,6 +105,7 @@ class ImageView(QGraphicsView):
             self._zoom /= zoom_factor
         self._zoom = max(0.1, min(self._zoom, 10.0))
         self.scale(factor, factor)
+        self.check_hover()
 
     def mouseDoubleClickEvent(self, event):
         self._fit_enabled = True
@@ -103,41 +121,40 @@ class ImageView(QGraphicsView):
             ctrl = bool(event.modifiers() & Qt.ControlModifier)
 
             if ctrl:
-                for box in list(self.text_boxes):
-                    if box.rect.contains(scene_pos.toPoint()):
-                        wnd = self.window()
-                        try:
-                            if hasattr(wnd, 'text_boxes') and wnd.text_boxes is not None:
-                                wnd.text_boxes = [b for b in wnd.text_boxes if b is not box]
-                                self.text_boxes = wnd.text_boxes
-                            else:
-                                self.text_boxes = [b for b in self.text_boxes if b is not box]
+                box = self.box_at(scene_pos.toPoint())
+                if box is not None:
+                    wnd = self.window()
+                    try:
+                        if hasattr(wnd, 'text_boxes') and wnd.text_boxes is not None:
+                            wnd.text_boxes = [b for b in wnd.text_boxes if b is not box]
+                            self.text_boxes = wnd.text_boxes
+                        else:
+                            self.text_boxes = [b for b in self.text_boxes if b is not box]
 
+                        path = None
+                        try:
+                            path = wnd.entries[wnd.list_widget.currentRow()]
+                        except Exception:
                             path = None
-                            try:
-                                path = wnd.entries[wnd.list_widget.currentRow()]
-                            except Exception:
-                                path = None
-
-                            if path is not None and hasattr(wnd, 'ocr_cache'):
-                                try:
-                                    wnd.ocr_cache.set_for_path(path, wnd.text_boxes, getattr(wnd, 'frames', None))
-                                except Exception:
-                                    pass
 
+                        if path is not None and hasattr(wnd, 'ocr_cache'):
                             try:
-                                wnd.text_export_panel.set_boxes(wnd.text_boxes, frames=getattr(wnd, 'frames', None), path=path)
+                                wnd.ocr_cache.set_for_path(path, wnd.text_boxes, getattr(wnd, 'frames', None))
                             except Exception:
                                 pass
 
-                            if path is not None:
-                                try:
-                                    wnd.show_preview(path, boxes=wnd.text_boxes, frames=getattr(wnd, 'frames', None), reset_zoom=False)
-                                except Exception:
-                                    pass
+                        try:
+                            wnd.text_export_panel.set_boxes(wnd.text_boxes, frames=getattr(wnd, 'frames', None), path=path)
                         except Exception:
                             pass
-                        break
+
+                        if path is not None:
+                            try:
+                                wnd.show_preview(path, boxes=wnd.text_boxes, frames=getattr(wnd, 'frames', None), reset_zoom=False)
+                            except Exception:
+                                pass
+                    except Exception:
+                        pass
 
                 else:
                     self._creating_box = True
@@ -154,39 +171,37 @@ class ImageView(QGraphicsView):
                         self._rubber_rect = None
                 return
 
-            for box in self.text_boxes:
-                if box.rect.contains(scene_pos.toPoint()):
-                    QGuiApplication.clipboard().setText(box.text.strip())
+            box = self.box_at(scene_pos.toPoint())
+            if box is not None:
+                QGuiApplication.clipboard().setText(box.text.strip())
+                try:
+                    vp_pos = self.viewport().mapFromGlobal(QCursor.pos())
+                    self.copy_feedback.setText("Скопировано")
+                    self.copy_feedback.adjustSize()
+                    x = vp_pos.x() + 15
+                    y = vp_pos.y() + 15
+                    self.copy_feedback.move(int(x), int(y))
+                    self.copy_feedback.show()
+                    QTimer.singleShot(700, lambda: self.copy_feedback.hide())
+                except Exception:
+                    pass
+        elif event.button() == Qt.RightButton:
+            scene_pos = self.mapToScene(event.position().toPoint())
+            box = self.box_at(scene_pos.toPoint())
+            if box is not None:
+                wnd = self.window()
+                jard = getattr(wnd, 'jardic_widget', None)
+                if jard is not None:
                     try:
-                        vp_pos = self.viewport().mapFromGlobal(QCursor.pos())
-                        self.copy_feedback.setText("Скопировано")
-                        self.copy_feedback.adjustSize()
-                        x = vp_pos.x() + 15
-                        y = vp_pos.y() + 15
-                        self.copy_feedback.move(int(x), int(y))
-                        self.copy_feedback.show()
-                        QTimer.singleShot(700, lambda: self.copy_feedback.hide())
+                        jard.send_text_to_jardic(box.text)
+                        act = getattr(wnd, 'jardic_act', None)
+                        if act is not None:
+                            try:
+                                act.setChecked(True)
+                            except Exception:
+                                pass
                     except Exception:
                         pass
-                    break
-        elif event.button() == Qt.RightButton:
-            scene_pos = self.mapToScene(event.position().toPoint())
-            for box in self.text_boxes:
-                if box.rect.contains(scene_pos.toPoint()):
-                    wnd = self.window()
-                    jard = getattr(wnd, 'jardic_widget', None)
-                    if jard is not None:
-                        try:
-                            jard.send_text_to_jardic(box.text)
-                            act = getattr(wnd, 'jardic_act', None)
-                            if act is not None:
-                                try:
-                                    act.setChecked(True)
-                                except Exception:
-                                    pass
-                        except Exception:
-                            pass
-                    break
 
         super().mousePressEvent(event)
 
@@ -208,31 +223,15 @@ class ImageView(QGraphicsView):
                         obj.rect = rect
                         obj.frame_rect = None
                         obj.text = ""
+                        obj.pending = True
 
                         wnd = self.window()
-                        pixmap = getattr(wnd, 'last_pixmap_for_cache', None)
-                        if pixmap is not None:
-                            try:
-                                img_cv = pixmap_to_cv(pixmap)
-                                x, y, w, h = rect.getRect()[0:4]
-                                x, y = max(0, x), max(0, y)
-                                w, h = min(w, img_cv.shape[1] - x), min(h, img_cv.shape[0] - y)
-                                if w > 0 and h > 0:
-                                    crop = img_cv[y:y+h, x:x+w]
-                                    try:
-                                        pil = Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
-                                        obj.text = ""
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                pass
-
                         try:
                             if hasattr(wnd, 'text_boxes') and wnd.text_boxes is not None:
                                 wnd.text_boxes.append(obj)
                                 self.text_boxes = wnd.text_boxes
                             else:
-                                self.text_boxes.append(obj)
+                                self.text_boxes = self.text_boxes + [obj]
                             path = None
                             try:
                                 path = wnd.entries[wnd.list_widget.currentRow()]
@@ -256,64 +255,8 @@ class ImageView(QGraphicsView):
                                 except Exception:
                                     pass
 
-                            try:
-                                item = type('ImageItem', (), {})()
-                                item.pixmap = getattr(wnd, 'last_pixmap_for_cache', None)
-                                item.boxes = [obj]
-                                thr = OCRThread(wnd, item)
-
-                                def _on_finished(boxes, frames, img, token):
-                                    try:
-                                        if boxes and len(boxes) > 0:
-                                            new_text = boxes[0].text
-                                            for b in wnd.text_boxes:
-                                                try:
-                                                    if b is obj or (hasattr(b, 'rect') and b.rect == obj.rect):
-                                                        b.text = new_text
-                                                        break
-                                                except Exception:
-                                                    pass
-
-                                        try:
-                                            if path is not None and hasattr(wnd, 'ocr_cache'):
-                                                wnd.ocr_cache.set_for_path(path, wnd.text_boxes, getattr(wnd, 'frames', None))
-                                        except Exception:
-                                            pass
-                                        try:
-                                            wnd.text_export_panel.set_boxes(wnd.text_boxes, frames=getattr(wnd, 'frames', None), path=path)
-                                        except Exception:
-                                            pass
-                                        try:
-                                            if path is not None:
-                                                wnd.show_preview(path, boxes=wnd.text_boxes, frames=getattr(wnd, 'frames', None), reset_zoom=False)
-                                        except Exception:
-                                            pass
-                                    except Exception:
-                                        pass
-
-                                thr.finished.connect(_on_finished)
-                                try:
-                                    if not hasattr(wnd, '_active_ocr_threads'):
-                                        wnd._active_ocr_threads = []
-                                    wnd._active_ocr_threads.append(thr)
-                                except Exception:
-                                    pass
-
-                                def _cleanup_thread():
-                                    try:
-                                        if hasattr(wnd, '_active_ocr_threads') and thr in wnd._active_ocr_threads:
-                                            wnd._active_ocr_threads.remove(thr)
-                                    except Exception:
-                                        pass
-                                    try:
-                                        thr.deleteLater()
-                                    except Exception:
-                                        pass
-
-                                thr.finished.connect(_cleanup_thread)
-                                thr.start()
-                            except Exception:
-                                pass
+                            if path is not None and hasattr(wnd, 'recognize_region'):
+                                wnd.recognize_region(path, obj)
                         except Exception:
                             pass
 
@@ -387,20 +330,6 @@ class ImageView(QGraphicsView):
         else:
             self.setCursor(Qt.ArrowCursor)
 
-        hovered = False
-        for box in self.text_boxes:
-            if box.rect.contains(scene_pos.toPoint()):
-                self.hovered_text.setText(box.text)
-                self.hovered_text.adjustSize()
-                vp_pos = event.position().toPoint()
-                x = vp_pos.x() + 15
-                y = vp_pos.y() + 15
-                self.hovered_text.move(int(x), int(y))
-                self.hovered_text.show()
-                hovered = True
-                break
-
-        if not hovered:
-            self.hovered_text.hide()
+        self.check_hover(event.position().toPoint())
 
         super().mouseMoveEvent(event)
@@ -1,6 +1,8 @@
 from PySide6.QtWidgets import QListWidget, QListWidgetItem
 from PySide6.QtCore import Qt, QPoint
 from pathlib import Path
+from ..core.cache import detection_data, recognition_data
+from ..core.utils import assign_frames, sort_reading_order
 
 class TextExportPanel(QListWidget):
     def __init__(self, parent=None):
@@ -12,6 +14,7 @@ class TextExportPanel(QListWidget):
         self.setResizeMode(QListWidget.Adjust)
         self._boxes = []
         self._frames = None
+        self._cached_state = None
         self.current_path = None
 
     def set_boxes(self, boxes, frames=None, path=None):
@@ -21,12 +24,7 @@ class TextExportPanel(QListWidget):
         self.current_path = path
 
         if frames is not None:
-            for box in boxes:
-                if box.frame_rect is None:
-                    for f in frames:
-                        if f.rect.contains(box.rect.center()):
-                            box.frame_rect = f.rect
-                            break
+            assign_frames(boxes, frames)
 
         sorted_boxes = self._sort_boxes(boxes, frames)
         self._boxes = sorted_boxes
@@ -37,23 +35,7 @@ class TextExportPanel(QListWidget):
         self._update_cache()
 
     def _sort_boxes(self, boxes, frames=None):
-        frame_dict = {}
-        for box in boxes:
-            if hasattr(box, 'frame_rect') and box.frame_rect is not None:
-                f = box.frame_rect
-                key = (f.left(), f.top(), f.width(), f.height())
-                frame_dict.setdefault(key, []).append(box)
-
-        sorted_frame_keys = sort_frames_manga_style(list(frame_dict.keys()))
-        sorted_boxes = []
-        for key in sorted_frame_keys:
-            bxs = frame_dict[key]
-            sorted_boxes.extend(sort_boxes_with_tolerance(bxs))
-
-        unframed = [box for box in boxes if not hasattr(box, 'frame_rect') or box.frame_rect is None]
-        unframed_sorted = sorted(unframed, key=lambda b: (-b.rect.left(), b.rect.top()))
-        sorted_boxes.extend(unframed_sorted)
-        return sorted_boxes
+        return sort_reading_order(boxes)
 
     def dropEvent(self, event):
         super().dropEvent(event)
@@ -68,11 +50,15 @@ class TextExportPanel(QListWidget):
     def _update_cache(self):
         if self.current_path is None:
             return
+        state = (str(self.current_path), detection_data(self._boxes, self._frames), recognition_data(self._boxes))
+        if state == self._cached_state:
+            return
         wnd = self.window()
         if hasattr(wnd, 'ocr_cache'):
             try:
                 frames = self._frames
                 wnd.ocr_cache.set_for_path(self.current_path, self._boxes, frames)
+                self._cached_state = state
             except Exception as e:
                 print("Ошибка обновления кэша:", e)
 
@@ -101,39 +87,3 @@ class TextExportPanel(QListWidget):
                         pass
                 return
         super().mousePressEvent(event)
-
-def sort_frames_manga_style(frames, overlap_threshold=5):
-    def is_same_row(f, row):
-        for r in row:
-            top1, bottom1 = f[1], f[1] + f[3]
-            top2, bottom2 = r[1], r[1] + r[3]
-            overlap = min(bottom1, bottom2) - max(top1, top2)
-            if overlap >= -overlap_threshold:
-                return True
-        return False
-
-    frames = sorted(frames, key=lambda f: f[1]) 
-    rows = []
-    for f in frames:
-        placed = False
-        for row in rows:
-            if is_same_row(f, row):
-                row.append(f)
-                placed = True
-                break
-        if not placed:
-            rows.append([f])
-
-    rows.sort(key=lambda row: min(f[1] for f in row))
-
-    sorted_result = []
-    for row in rows:
-        row_sorted = sorted(row, key=lambda f: -f[0])
-        sorted_result.extend(row_sorted)
-
-    return sorted_result
-
-def sort_boxes_with_tolerance(boxes, x_tolerance=20):
-    def box_key(b):
-        return (round(-b.rect.left() / x_tolerance), b.rect.top())
-    return sorted(boxes, key=box_key)
\ No newline at end of file
@@ -0,0 +1,71 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
+    QHeaderView, QFileDialog
+)
+from PySide6.QtCore import Qt, QTimer
+from ..core.trace import tracer
+
+class TimingsPanel(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Этап", "n", "p50, мс", "p95, мс"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+
+        self.clear_button = QPushButton("Сбросить")
+        self.clear_button.clicked.connect(self.clear)
+        self.save_button = QPushButton("Сохранить трассу...")
+        self.save_button.clicked.connect(self.save_trace)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.clear_button)
+        buttons.addWidget(self.save_button)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def on_timings(self, timings, token=None):
+        if self.isVisible():
+            self.refresh()
+
+    def refresh(self):
+        stats = tracer.stats()
+        self.table.setRowCount(len(stats))
+        for row, name in enumerate(sorted(stats)):
+            stage = stats[name]
+            values = [name, str(stage["count"]), f"{stage['p50_ms']:.1f}", f"{stage['p95_ms']:.1f}"]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+    def clear(self):
+        tracer.clear()
+        self.refresh()
+
+    def save_trace(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить трассу", tracer.path or "mangaocr_trace.json",
+            "Chrome trace (*.json)"
+        )
+        if filename:
+            tracer.save(filename)
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+from PIL import Image
+from PySide6.QtCore import QSettings
+from PySide6.QtGui import QPixmap
+from PySide6.QtWidgets import QApplication, QGraphicsScene, QMainWindow
+from app.core.cache import OCRCache, crop_digest, file_digest, pixmap_md5
+from app.core.detection import detect_text_boxes
+from app.core.imagecache import decoded_images
+from app.core.imaging import imread_unicode
+from app.core.ocr import recognize_boxes
+from app.core.pipeline import OCRPipeline
+from app.core.recognizer import StubRecognizer
+from app.core.trace import percentile
+from app.core.utils import MangaTextBox, assign_frames
+from benchmarks.synthetic import StubDetector, page_layout, write_pages
+
+STAGES = (
+    "decode", "decoded_cache_hit", "detect", "crop_cvtcolor", "recognize", "crop_digest",
+    "file_digest", "digest_for_path", "pixmap_md5", "sort_boxes", "show_preview",
+    "show_preview_overlay", "pipeline_page",
+)
+
+class Timings:
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - t0)
+        return result
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        out = {}
+        for name in STAGES:
+            values = sorted(self.samples.get(name, []))
+            if not values:
+                continue
+            out[name] = {
+                "count": len(values),
+                "total_ms": sum(values) * 1000,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "min_ms": values[0] * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+            }
+        return out
+
+def load_models(args, layout):
+    if args.real:
+        from app.core.threads import load_detector, load_recognizer
+        detector, _ = load_detector(args.models)
+        recognizer, _ = load_recognizer(args.models, args.recognizer)
+        return detector, recognizer
+    detector = StubDetector(layout, latency=args.detector_latency)
+    recognizer = StubRecognizer(latency=args.recognizer_latency, per_image_latency=args.crop_latency)
+    return detector, recognizer
+
+def preview_harness():
+    from app.ui.mainwindow import MainWindow
+    from app.ui.preview import ImageView
+
+    window = MainWindow.__new__(MainWindow)
+    QMainWindow.__init__(window)
+    window.settings = QSettings(os.path.join(tempfile.gettempdir(), "mangaocr-bench.ini"), QSettings.IniFormat)
+    window._decoded_images = None
+    window._preview_path = None
+    window._overlay_items = []
+    window._frame_items = []
+    if window.decoded_images is not decoded_images:
+        raise RuntimeError("превью не использует общий кэш декодированных страниц")
+    window.scene = QGraphicsScene()
+    window.preview_view = ImageView()
+    window.preview_view.setScene(window.scene)
+    window.preview_view.resize(900, 1200)
+    window.show_frames = True
+    window.current_pixmap_item = None
+    return window
+
+def crop_and_convert(img_cv, boxes):
+    crops = []
+    h_img, w_img = img_cv.shape[:2]
+    for box in boxes:
+        x, y, w, h = box.rect.getRect()
+        crop = img_cv[max(0, y):min(h_img, y + h), max(0, x):min(w_img, x + w)]
+        if crop.size:
+            crops.append(Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)))
+    return crops
+
+def run_stages(paths, detector, recognizer, repeat, batch_size):
+    from app.ui.textexportpanel import TextExportPanel
+
+    timings = Timings()
+    panel = TextExportPanel()
+    harness = preview_harness()
+    cache = OCRCache(persistent=False)
+    fingerprint = getattr(recognizer, 'fingerprint', None) or "bench"
+
+    for _ in range(repeat):
+        for path in paths:
+            img_cv = timings.measure("decode", imread_unicode, path)
+            decoded_images.get(path)
+            timings.measure("decoded_cache_hit", decoded_images.get, path)
+            boxes, frames = timings.measure("detect", detect_text_boxes, detector, img_cv)
+            boxes = [MangaTextBox(b.rect, "") for b in boxes]
+            timings.measure("crop_cvtcolor", crop_and_convert, img_cv, boxes)
+            timings.measure("recognize", recognize_boxes, recognizer, img_cv, boxes,
+                            batch_size=batch_size, memo=False)
+
+            for box in boxes:
+                x, y, w, h = box.rect.getRect()
+                timings.measure("crop_digest", crop_digest, img_cv[y:y + h, x:x + w], fingerprint)
+
+            timings.measure("file_digest", file_digest, path)
+            cache.digest_for_path(path)
+            timings.measure("digest_for_path", cache.digest_for_path, path)
+            timings.measure("pixmap_md5", pixmap_md5, QPixmap(str(path)))
+
+            assign_frames(boxes, frames)
+            timings.measure("sort_boxes", panel._sort_boxes, boxes, frames)
+            timings.measure("show_preview", harness.show_preview, path, boxes=boxes, frames=frames)
+            timings.measure("show_preview_overlay", harness.show_preview, path, boxes=boxes[1:], frames=frames)
+            QApplication.processEvents()
+
+    return timings
+
+def run_pipeline(paths, detector, recognizer, timings, batch_size):
+    app_ref = SimpleNamespace(mocr=recognizer, yolo_detector=detector, ocr_cache=None)
+    pipeline = OCRPipeline(app_ref, batch_size=batch_size)
+    t0 = time.perf_counter()
+    last = [t0]
+
+    def on_finished(idx, path, boxes, frames, info):
+        now = time.perf_counter()
+        timings.add("pipeline_page", now - last[0])
+        last[0] = now
+
+    pipeline.run(paths, on_finished=on_finished)
+    return time.perf_counter() - t0
+
+def compare(result, baseline, tolerance, min_delta_ms=1.0):
+    regressions = []
+    for name, stage in result["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            continue
+        delta = stage["p50_ms"] - base["p50_ms"]
+        if delta > min_delta_ms and stage["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append((name, base["p50_ms"], stage["p50_ms"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время этапов OCR на синтетических страницах")
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=2400)
+    parser.add_argument("--format", choices=("png", "jpg"), default="jpg")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--detector-latency", type=float, default=0.02, help="задержка заглушки детектора, с")
+    parser.add_argument("--recognizer-latency", type=float, default=0.01, help="задержка на пакет, с")
+    parser.add_argument("--crop-latency", type=float, default=0.002, help="задержка на кроп, с")
+    parser.add_argument("--real", action="store_true", help="настоящие модели из models/")
+    parser.add_argument("--models", default=None)
+    parser.add_argument("--recognizer", default=None, help="движок распознавания для --real")
+    parser.add_argument("--workdir", default=None, help="папка для страниц (по умолчанию временная)")
+    parser.add_argument("--json", default=None, help="записать результат в JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост медианы")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    layout = page_layout()
+
+    with tempfile.TemporaryDirectory(prefix="mangaocr-bench-") as tmp:
+        workdir = Path(args.workdir or tmp)
+        paths = write_pages(workdir, args.pages, args.width, args.height, layout, ext=f".{args.format}")
+        detector, recognizer = load_models(args, layout)
+
+        timings = run_stages(paths, detector, recognizer, args.repeat, args.batch_size)
+        pipeline_s = run_pipeline(paths, detector, recognizer, timings, args.batch_size)
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "models": "real" if args.real else "stub",
+            "pages": args.pages,
+            "page_size": [args.width, args.height],
+            "format": args.format,
+            "repeat": args.repeat,
+            "batch_size": args.batch_size,
+            "detector_latency": args.detector_latency,
+            "recognizer_latency": args.recognizer_latency,
+            "crop_latency": args.crop_latency,
+        },
+        "stages": timings.summary(),
+        "pipeline": {"total_s": pipeline_s, "pages_per_s": args.pages / pipeline_s if pipeline_s else 0.0},
+    }
+
+    for name, stage in result["stages"].items():
+        print(f"{name:16s} p50 {stage['p50_ms']:8.2f} ms  p95 {stage['p95_ms']:8.2f} ms  n={stage['count']}")
+    print(f"pipeline: {result['pipeline']['pages_per_s']:.2f} стр/с")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"РЕГРЕССИЯ: {name} {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PySide6.QtGui import QGuiApplication, QImage, QPixmap
+from app.core.imaging import pixmap_to_cv, pixmap_to_rgb
+
+def legacy_pixmap_to_cv(pixmap):
+    qimg = pixmap.toImage().convertToFormat(QImage.Format.Format_RGB888)
+    width, height = qimg.width(), qimg.height()
+    ptr = qimg.bits()
+    data = ptr.tobytes() if hasattr(ptr, 'tobytes') else bytes(ptr)
+    bytes_per_line = qimg.bytesPerLine()
+    arr = np.frombuffer(data, np.uint8).reshape((height, bytes_per_line))
+    arr = arr[:, :width*3].reshape((height, width, 3))
+    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+
+def make_page(width, height):
+    rng = np.random.default_rng(0)
+    page = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    qimg = QImage(page.data, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+    return QPixmap.fromImage(qimg)
+
+def measure(fn, pixmap, repeat):
+    fn(pixmap)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(pixmap)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    result = fn(pixmap)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return min(times), sorted(times)[len(times) // 2], peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pixmap_to_cv: копирование и время конвертации")
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    pixmap = make_page(args.width, args.height)
+
+    assert np.array_equal(legacy_pixmap_to_cv(pixmap), pixmap_to_cv(pixmap))
+
+    rows = [
+        ("legacy pixmap_to_cv (BGR)", legacy_pixmap_to_cv),
+        ("pixmap_to_cv (BGR)", pixmap_to_cv),
+        ("pixmap_to_rgb (view)", pixmap_to_rgb),
+    ]
+    page_mb = args.width * args.height * 3 / 1e6
+    print(f"page {args.width}x{args.height}, {page_mb:.1f} MB RGB")
+    for name, fn in rows:
+        best, median, peak = measure(fn, pixmap, args.repeat)
+        print(f"{name:28s} best {best * 1000:7.2f} ms  median {median * 1000:7.2f} ms  "
+              f"numpy alloc {peak / 1e6:6.1f} MB ({peak / 1e6 / page_mb:.1f} pages)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.recognizer import OnnxRecognizer, TorchRecognizer, recognize_batch
+from app.core.threads import model_paths
+from app.core.trace import percentile
+
+def synthetic_crops(count, seed=0):
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    crops = []
+    for _ in range(count):
+        w, h = int(rng.integers(60, 140)), int(rng.integers(160, 420))
+        img = Image.new("RGB", (w, h), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for y in range(8, h - 24, 28):
+            x = int(rng.integers(4, max(5, w - 28)))
+            draw.rectangle((x, y, x + 18, y + 18), outline=(0, 0, 0), width=2)
+        crops.append(img)
+    return crops
+
+def load_crops(paths, limit):
+    from PIL import Image
+
+    crops = []
+    for p in map(Path, paths):
+        for f in sorted(p.iterdir()) if p.is_dir() else [p]:
+            if len(crops) >= limit:
+                return crops
+            try:
+                crops.append(Image.open(f).convert("RGB"))
+            except Exception:
+                continue
+    return crops
+
+def measure(recognizer, crops, batch_size, repeat):
+    recognize_batch(recognizer, crops[:batch_size])
+    samples = []
+    for _ in range(repeat):
+        for i in range(0, len(crops), batch_size):
+            batch = crops[i:i + batch_size]
+            t0 = time.perf_counter()
+            recognize_batch(recognizer, batch)
+            samples.append((time.perf_counter() - t0) / len(batch))
+    samples.sort()
+    return {
+        "crops": len(crops),
+        "p50_ms_per_crop": percentile(samples, 50) * 1000,
+        "p95_ms_per_crop": percentile(samples, 95) * 1000,
+        "mean_ms_per_crop": sum(samples) / len(samples) * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение распознавания MangaOcr (PyTorch) и ONNX Runtime на CPU")
+    parser.add_argument("--models", default=None)
+    parser.add_argument("--crops", nargs="*", default=None, help="кропы реплик (файлы или папки)")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="потоков ONNX Runtime (0 - по умолчанию)")
+    parser.add_argument("--json", default=None, help="записать результат в JSON")
+    args = parser.parse_args(argv)
+
+    crops = load_crops(args.crops, args.count) if args.crops else synthetic_crops(args.count)
+    if not crops:
+        print("Нет кропов для замера", file=sys.stderr)
+        return 2
+
+    paths = model_paths(args.models)
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "batch_size": args.batch_size,
+            "repeat": args.repeat,
+        },
+        "torch": measure(TorchRecognizer(paths["mocr"], force_cpu=True), crops, args.batch_size, args.repeat),
+        "onnx": measure(OnnxRecognizer(paths["onnx"], num_threads=args.threads), crops, args.batch_size, args.repeat),
+    }
+
+    for name in ("torch", "onnx"):
+        stage = result[name]
+        print(f"{name:6s} p50 {stage['p50_ms_per_crop']:8.2f} ms/кроп  p95 {stage['p95_ms_per_crop']:8.2f} ms/кроп")
+    speedup = result["torch"]["p50_ms_per_crop"] / max(result["onnx"]["p50_ms_per_crop"], 1e-9)
+    result["speedup"] = speedup
+    print(f"ONNX быстрее в {speedup:.2f} раза")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
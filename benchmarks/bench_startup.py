@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = (
+    "torch", "transformers", "ultralytics", "manga_ocr", "onnxruntime",
+    "cv2", "numpy", "PIL", "docx", "requests", "bs4", "loguru",
+    "PySide6.QtWebEngineWidgets",
+)
+
+FIRST_WINDOW_SNIPPET = """
+import os, sys, time
+t0 = time.perf_counter()
+from PySide6.QtCore import Qt, QCoreApplication
+from PySide6.QtWidgets import QApplication
+from app.ui.mainwindow import MainWindow
+heavy = [m for m in {heavy!r} if m in sys.modules]
+QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+t1 = time.perf_counter()
+print("READY", t1 - t0, ",".join(heavy), flush=True)
+os._exit(0)
+"""
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def import_profile(module="app.ui.mainwindow"):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    total = next((c for n, _, c in rows if n == module), None)
+    return total, rows
+
+def first_window():
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", FIRST_WINDOW_SNIPPET.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=child_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    ready = None
+    for line in proc.stdout:
+        if line.startswith("READY"):
+            ready = line.split()
+            break
+    wall = time.perf_counter() - t0
+    proc.wait()
+    if ready is None:
+        raise RuntimeError("окно не было показано")
+    heavy = ready[2].split(",") if len(ready) > 2 and ready[2] else []
+    return wall, float(ready[1]), heavy
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время холодного старта до первого окна")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1500.0,
+                        help="порог времени до первого окна (медиана, с запуском интерпретатора)")
+    parser.add_argument("--json", default=None, help="записать результат в JSON")
+    args = parser.parse_args(argv)
+
+    total_us, rows = import_profile()
+    top = sorted(rows, key=lambda r: r[2], reverse=True)[:15]
+
+    walls, in_process, heavy = [], [], set()
+    for _ in range(args.runs):
+        wall, inside, loaded = first_window()
+        walls.append(wall)
+        in_process.append(inside)
+        heavy.update(loaded)
+
+    walls.sort()
+    in_process.sort()
+    median_wall = walls[len(walls) // 2]
+    result = {
+        "import_mainwindow_ms": (total_us or 0) / 1000,
+        "first_window_ms": median_wall * 1000,
+        "first_window_in_process_ms": in_process[len(in_process) // 2] * 1000,
+        "heavy_modules_imported_by_ui": sorted(heavy),
+        "top_imports": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c in top],
+        "budget_ms": args.budget_ms,
+    }
+
+    print(f"import app.ui.mainwindow: {result['import_mainwindow_ms']:.1f} ms")
+    print(f"до первого окна: {result['first_window_ms']:.1f} ms "
+          f"(внутри процесса {result['first_window_in_process_ms']:.1f} ms)")
+    for item in result["top_imports"]:
+        print(f"  {item['cumulative_ms']:8.1f} ms  {item['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    failed = False
+    if heavy:
+        print(f"РЕГРЕССИЯ: тяжёлые модули импортируются вместе с окном: {', '.join(sorted(heavy))}")
+        failed = True
+    if result["first_window_ms"] > args.budget_ms:
+        print(f"РЕГРЕССИЯ: {result['first_window_ms']:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
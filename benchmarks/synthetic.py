@@ -0,0 +1,136 @@
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BOX_CLASS = 3
+FRAME_CLASS = 2
+
+def page_layout(cols=2, rows=3, bubbles_per_panel=2, seed=0):
+    rng = np.random.default_rng(seed)
+    margin, gutter = 0.04, 0.02
+    panel_w = (1 - 2 * margin - (cols - 1) * gutter) / cols
+    panel_h = (1 - 2 * margin - (rows - 1) * gutter) / rows
+
+    layout = []
+    for row in range(rows):
+        for col in range(cols):
+            px = margin + col * (panel_w + gutter)
+            py = margin + row * (panel_h + gutter)
+            layout.append((FRAME_CLASS, px, py, px + panel_w, py + panel_h))
+            for i in range(bubbles_per_panel):
+                bw = panel_w * rng.uniform(0.18, 0.3)
+                bh = panel_h * rng.uniform(0.35, 0.6)
+                bx = px + panel_w * (0.05 + 0.5 * i) + rng.uniform(0, panel_w * 0.1)
+                by = py + rng.uniform(0.05, 0.95 - bh / panel_h) * panel_h
+                layout.append((BOX_CLASS, bx, by, min(bx + bw, px + panel_w), by + bh))
+    return layout
+
+def make_page(width, height, layout, seed=0):
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    for cls, x1, y1, x2, y2 in layout:
+        if cls != FRAME_CLASS:
+            continue
+        p1, p2 = _pixels(x1, y1, x2, y2, width, height)
+        panel = page[p1[1]:p2[1], p1[0]:p2[0]]
+        tone = np.zeros(panel.shape[:2], dtype=bool)
+        tone[::6, ::6] = True
+        panel[tone] = 150
+        for _ in range(25):
+            a = (int(rng.integers(p1[0], p2[0])), int(rng.integers(p1[1], p2[1])))
+            b = (int(rng.integers(p1[0], p2[0])), int(rng.integers(p1[1], p2[1])))
+            cv2.line(page, a, b, (40, 40, 40), int(rng.integers(1, 4)), cv2.LINE_AA)
+        cv2.rectangle(page, p1, p2, (0, 0, 0), 4)
+
+    for cls, x1, y1, x2, y2 in layout:
+        if cls != BOX_CLASS:
+            continue
+        p1, p2 = _pixels(x1, y1, x2, y2, width, height)
+        center = ((p1[0] + p2[0]) // 2, (p1[1] + p2[1]) // 2)
+        axes = ((p2[0] - p1[0]) // 2, (p2[1] - p1[1]) // 2)
+        cv2.ellipse(page, center, axes, 0, 0, 360, (255, 255, 255), -1, cv2.LINE_AA)
+        cv2.ellipse(page, center, axes, 0, 0, 360, (0, 0, 0), 3, cv2.LINE_AA)
+        _draw_vertical_text(page, center, axes, rng)
+
+    return page
+
+def _draw_vertical_text(page, center, axes, rng):
+    glyph = max(12, min(axes) // 4)
+    columns = max(1, int(axes[0] * 1.2 // (glyph * 1.4)))
+    x0 = center[0] + (columns - 1) * glyph * 0.7
+    for c in range(columns):
+        x = int(x0 - c * glyph * 1.4)
+        count = int(rng.integers(2, max(3, int(axes[1] * 1.4 // glyph))))
+        y = int(center[1] - count * glyph / 2)
+        for _ in range(count):
+            for _ in range(int(rng.integers(2, 5))):
+                a = (x + int(rng.integers(-glyph // 2, glyph // 2)), y + int(rng.integers(0, glyph)))
+                b = (x + int(rng.integers(-glyph // 2, glyph // 2)), y + int(rng.integers(0, glyph)))
+                cv2.line(page, a, b, (0, 0, 0), 2, cv2.LINE_AA)
+            y += glyph
+
+def _pixels(x1, y1, x2, y2, width, height):
+    return (int(x1 * width), int(y1 * height)), (int(x2 * width), int(y2 * height))
+
+def write_pages(out_dir, count, width, height, layout, ext=".png"):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = out_dir / f"page_{i + 1:03d}{ext}"
+        ok, data = cv2.imencode(ext, make_page(width, height, layout, seed=i))
+        if not ok:
+            raise RuntimeError(f"не удалось закодировать {path}")
+        path.write_bytes(data.tobytes())
+        paths.append(path)
+    return paths
+
+class StubDetector:
+    def __init__(self, layout, latency=0.0, per_image_latency=0.0):
+        self.layout = layout
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.calls = 0
+        self.images = 0
+
+    def __call__(self, source, conf=0.25, iou=0.45, classes=None):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        self.calls += 1
+        self.images += len(images)
+        delay = self.latency + self.per_image_latency * len(images)
+        if delay > 0:
+            time.sleep(delay)
+        return [self._result(img.shape, classes) for img in images]
+
+    def _result(self, shape, classes):
+        h, w = shape[:2]
+        boxes = []
+        for cls, x1, y1, x2, y2 in self.layout:
+            if classes is not None and cls not in classes:
+                continue
+            xyxy = np.array([x1 * w, y1 * h, x2 * w, y2 * h], dtype=np.float32)
+            boxes.append(_StubBox(cls, xyxy))
+        return _StubResult(boxes)
+
+class _StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+class _StubBox:
+    def __init__(self, cls, xyxy, conf=0.9):
+        self.cls = [cls]
+        self.xyxy = [_StubTensor(xyxy)]
+        self.conf = [conf]
+
+class _StubTensor:
+    def __init__(self, value):
+        self.value = value
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.value
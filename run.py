@@ -1,10 +1,17 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from app.ui.mainwindow import MainWindow
-from PySide6.QtGui import QIcon
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "ocr":
+        from app.cli import main
+        sys.exit(main(sys.argv[2:]))
+
+    from PySide6.QtCore import Qt, QCoreApplication
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+    from app.ui.mainwindow import MainWindow
+
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon("app/ui/icons/Mocr.png"))
     window = MainWindow()